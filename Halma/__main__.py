@@ -13,6 +13,11 @@ def main() -> None:
     parser.add_argument("--client", action="store_true", help="Executar como cliente")
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=50007)
+    parser.add_argument(
+        "--legacy-framing",
+        action="store_true",
+        help="Cliente envia JSON + newline (servidores sem suporte a prefixo de tamanho)",
+    )
     args = parser.parse_args()
 
     if args.server == args.client:
@@ -23,7 +28,7 @@ def main() -> None:
         logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
         HalmaServer(args.host, args.port).start()
     else:
-        GameClient(args.host, args.port).run()
+        GameClient(args.host, args.port, not args.legacy_framing).run()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Deque, Iterable, List, Optional, Sequence, Set, Tuple
+import base64
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
 
-from .protocol import Cell, neighbors
+from .protocol import DIRS, Cell, neighbors
 from .config import N
 
 
@@ -22,64 +22,172 @@ def camp_cells_bottom_right() -> Set[Tuple[int, int]]:
 
 CAMP_A = camp_cells_top_left()
 CAMP_B = camp_cells_bottom_right()
+# Mesmos campos em índices da grade linear (r * N + c)
+CAMP_A_IDX: Tuple[int, ...] = tuple(sorted(r * N + c for r, c in CAMP_A))
+CAMP_B_IDX: Tuple[int, ...] = tuple(sorted(r * N + c for r, c in CAMP_B))
+
+
+# Bitboards: bit r * N + c de um int representa a casa (r, c)
+CAMP_A_MASK = sum(1 << i for i in CAMP_A_IDX)
+CAMP_B_MASK = sum(1 << i for i in CAMP_B_IDX)
+
+# bytearray.translate -> string binária: grade -> bitboard de um jogador com int(..., 2)
+_BITS_P1 = bytes(0x31 if v == Cell.P1 else 0x30 for v in range(256))
+_BITS_P2 = bytes(0x31 if v == Cell.P2 else 0x30 for v in range(256))
+
+
+def bitboard(grid: bytearray, player: int) -> int:
+    table = _BITS_P1 if player == Cell.P1 else _BITS_P2
+    return int(grid.translate(table)[::-1], 2)
 
 
 class Board:
+    """Tabuleiro N×N guardado como um bytearray linear: a casa (r, c) fica em r * N + c.
+
+    `p1_bb`/`p2_bb` espelham a grade como bitboards e são mantidos por `set_cell`.
+    """
+
     def __init__(self) -> None:
-        self.grid: List[List[int]] = [[Cell.EMPTY for _ in range(N)] for _ in range(N)]
-        for r, c in CAMP_A:
-            self.grid[r][c] = Cell.P1
-        for r, c in CAMP_B:
-            self.grid[r][c] = Cell.P2
+        self.grid = bytearray(N * N)
+        for i in CAMP_A_IDX:
+            self.grid[i] = Cell.P1
+        for i in CAMP_B_IDX:
+            self.grid[i] = Cell.P2
+        self.p1_bb = CAMP_A_MASK
+        self.p2_bb = CAMP_B_MASK
+        self._wire: Optional[str] = None  # serialize() em cache; set_cell invalida
 
     @staticmethod
-    def deserialize(g: List[List[int]]) -> "Board":
-        b = Board()
-        b.grid = g
+    def deserialize(g: str) -> "Board":
+        grid = bytearray(base64.b64decode(g))
+        if len(grid) != N * N:
+            raise ValueError(f"grade com {len(grid)} casas, esperado {N * N}")
+        # Sem passar por __init__: a grade inicial seria montada só para ser descartada
+        b = Board.__new__(Board)
+        b.grid = grid
+        b.p1_bb = bitboard(b.grid, Cell.P1)
+        b.p2_bb = bitboard(b.grid, Cell.P2)
+        b._wire = g
         return b
 
-    def serialize(self) -> List[List[int]]:
-        return self.grid
+    def serialize(self) -> str:
+        """Formato de rede: os N*N bytes da grade em base64."""
+        # Cache preguiçoso em vez de remendo por casa: recodificar a grade inteira custa o mesmo
+        # que remendar dois grupos de 4 caracteres, e só acontece quando alguém serializa.
+        if self._wire is None:
+            self._wire = base64.b64encode(self.grid).decode("ascii")
+        return self._wire
+
+    def snapshot(self) -> bytes:
+        """Cópia imutável da grade (um único memcpy), para comparar com o estado atual depois."""
+        return bytes(self.grid)
+
+    def changes_since(self, snap: bytes) -> List[List[int]]:
+        """Pares [índice, valor] das casas que diferem de `snap`, em ordem crescente de índice."""
+        grid = self.grid
+        # XOR das grades como inteiros: a varredura dos N*N bytes fica em C e o laço
+        # Python só visita os bytes diferentes (tipicamente dois por lance)
+        diff = int.from_bytes(grid, "little") ^ int.from_bytes(snap, "little")
+        out: List[List[int]] = []
+        while diff:
+            i = (diff.bit_length() - 1) >> 3
+            out.append([i, grid[i]])
+            diff &= ~(0xFF << (i << 3))
+        out.reverse()
+        return out
 
     def inside(self, r: int, c: int) -> bool:
         return 0 <= r < N and 0 <= c < N
 
     def cell(self, r: int, c: int) -> int:
-        return self.grid[r][c]
+        return self.grid[r * N + c]
 
     def set_cell(self, r: int, c: int, v: int) -> None:
-        self.grid[r][c] = v
+        i = r * N + c
+        bit = 1 << i
+        old = self.grid[i]
+        if old == Cell.P1:
+            self.p1_bb &= ~bit
+        elif old == Cell.P2:
+            self.p2_bb &= ~bit
+        if v == Cell.P1:
+            self.p1_bb |= bit
+        elif v == Cell.P2:
+            self.p2_bb |= bit
+        self.grid[i] = v
+        self._wire = None
 
     def is_victory(self, player: int) -> bool:
-        target = CAMP_B if player == Cell.P1 else CAMP_A
-        return all(self.grid[r][c] == player for (r, c) in target)
+        # Equivale a contar os bits do campo-alvo (popcount == 15), sem depender do tamanho do campo
+        if player == Cell.P1:
+            return self.p1_bb & CAMP_B_MASK == CAMP_B_MASK
+        return self.p2_bb & CAMP_A_MASK == CAMP_A_MASK
+
+
+def _build_tables() -> Tuple[List[Tuple[int, ...]], List[Tuple[Tuple[int, int], ...]]]:
+    """Vizinhos a 1 passo e pares (meio, destino) de salto, por índice linear."""
+    neigh: List[Tuple[int, ...]] = []
+    jumps: List[Tuple[Tuple[int, int], ...]] = []
+    for r in range(N):
+        for c in range(N):
+            neigh.append(tuple((r1 * N + c1) for r1, c1 in neighbors(r, c) if 0 <= r1 < N and 0 <= c1 < N))
+            jumps.append(tuple(
+                ((r + dr) * N + (c + dc), (r + 2 * dr) * N + (c + 2 * dc))
+                for dr, dc in DIRS
+                if 0 <= r + 2 * dr < N and 0 <= c + 2 * dc < N
+            ))
+    return neigh, jumps
+
+
+# Tabelas estáticas: o tabuleiro não muda de tamanho, então calcula-se uma única vez.
+NEIGH, JUMPS = _build_tables()
+
+
+def compute_moves_flat(grid: bytearray, s: int) -> Tuple[List[int], Set[int]]:
+    """Núcleo sobre índices lineares: (vizinhos vazios, destinos de salto) a partir de `s`."""
+    simple = [i for i in NEIGH[s] if not grid[i]]
+
+    visited: Set[int] = {s}
+    q: List[int] = [s]
+    for idx in q:  # a lista cresce durante a iteração: funciona como fila da BFS
+        for mid, dst in JUMPS[idx]:
+            if grid[mid] and not grid[dst] and dst not in visited:
+                visited.add(dst)
+                q.append(dst)
+
+    visited.discard(s)
+    return simple, visited
+
+
+_BIT: Tuple[int, ...] = tuple(1 << i for i in range(N * N))
+_CELL: Tuple[Tuple[int, int], ...] = tuple((i // N, i % N) for i in range(N * N))
+
+
+def compute_move_masks(board: Board, start: Tuple[int, int]) -> Tuple[int, int]:
+    """Como `compute_moves`, mas em bitboards (bit r * N + c): para testes de pertinência no servidor."""
+    simple, jumps = compute_moves_flat(board.grid, start[0] * N + start[1])
+    bit = _BIT
+    simple_mask = 0
+    for i in simple:
+        simple_mask |= bit[i]
+    jumps_mask = 0
+    for i in jumps:
+        jumps_mask |= bit[i]
+    return simple_mask, jumps_mask
+
+
+def mask_indices(mask: int) -> List[int]:
+    """Índices (r * N + c) dos bits ligados, em ordem crescente."""
+    out: List[int] = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
 
 
 def compute_moves(board: Board, start: Tuple[int, int]) -> Tuple[Set[Tuple[int, int]], Set[Tuple[int, int]]]:
     """Retorna (simples, saltos) a partir de `start`. BFS para saltos múltiplos."""
-    r0, c0 = start
-    simple: Set[Tuple[int, int]] = set()
-    for r1, c1 in neighbors(r0, c0):
-        if board.inside(r1, c1) and board.cell(r1, c1) == Cell.EMPTY:
-            simple.add((r1, c1))
-
-    jump_dest: Set[Tuple[int, int]] = set()
-    q: Deque[Tuple[int, int]] = deque([start])
-    visited: Set[Tuple[int, int]] = {start}
-
-    DIRS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-
-    while q:
-        r, c = q.popleft()
-        for dr, dc in DIRS:
-            r_mid, c_mid = r + dr, c + dc
-            r2, c2 = r + 2 * dr, c + 2 * dc
-            if not board.inside(r2, c2):
-                continue
-            if board.inside(r_mid, c_mid) and board.cell(r_mid, c_mid) in (Cell.P1, Cell.P2) and board.cell(r2, c2) == Cell.EMPTY:
-                if (r2, c2) not in visited:
-                    visited.add((r2, c2))
-                    jump_dest.add((r2, c2))
-                    q.append((r2, c2))
-
-    return simple, jump_dest
\ No newline at end of file
+    simple, jumps = compute_moves_flat(board.grid, start[0] * N + start[1])
+    cell = _CELL
+    return {cell[i] for i in simple}, {cell[i] for i in jumps}
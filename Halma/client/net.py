@@ -1,17 +1,263 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import socket
 import threading
 import time
-from typing import Dict, List
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Dict, List, Optional
 
-from ..config import HEARTBEAT_SECONDS
-from ..protocol import MsgType
+from ..config import HEARTBEAT_SECONDS, MAX_FRAME, MAX_INBOX, RECV_CHUNK, SOCK_RCVBUF, SOCK_SNDBUF
+from ..protocol import LEN_HEADER, Buffer, MsgType, decode_line, encode_frame, encode_line
+
+__all__ = ["AsyncNetClient", "NetClient"]
+
+# Valores dos tipos usados nos caminhos quentes, resolvidos uma vez na importação
+_PING_T = MsgType.PING.value
+_OVERFLOW_T = MsgType.OVERFLOW.value
+_DISCONNECT_T = MsgType.DISCONNECT.value
+
+# Só existe no Linux; o kernel desarma a opção após cada ACK, então é reativada a cada recv
+_TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+
+# IPTOS_LOWDELAY: tráfego interativo
+_IPTOS_LOWDELAY = 0x10
+
+# Limite conservador de iovecs por sendmsg (POSIX garante ao menos 16; Linux aceita 1024)
+_IOV_MAX = 64
+
+
+def _decode_frame(line: Buffer, out: List[Dict[str, object]]) -> None:
+    """Decodifica um frame e o anexa a `out`; frames inválidos são descartados."""
+    try:
+        msg = decode_line(line)
+    except (ValueError, TypeError):
+        # Linha inválida (JSON/UTF-8 malformado): ignora
+        return
+    if isinstance(msg, dict):
+        out.append(msg)
+
+
+def _decode_batch(frames: List[Buffer], out: List[Dict[str, object]]) -> None:
+    """Decodifica todos os frames numa única list comprehension; se algum for inválido,
+    refaz um a um descartando só os ruins."""
+    try:
+        msgs = [decode_line(f) for f in frames]
+    except (ValueError, TypeError):
+        for f in frames:
+            _decode_frame(f, out)
+        return
+    out.extend(m for m in msgs if isinstance(m, dict))
+
+
+def _split_frames(buf: bytearray, end: int, scan: int, out: List[Dict[str, object]]) -> int:
+    """
+    Decodifica os frames completos de `buf[:end]` em `out` e retorna quantos bytes
+    consumiu (-1 se um prefixo anunciar mais que MAX_FRAME). Aceita os dois
+    enquadramentos, frame a frame: o servidor fala newline até ver o primeiro frame
+    com prefixo do cliente. `scan` é onde pode estar o primeiro "\n" ainda não visto.
+    """
+    start = 0
+    header = LEN_HEADER.size
+    frames: List[Buffer] = []
+    with memoryview(buf) as mv:
+        while start < end:
+            if buf[start] == 0:
+                if end - start < header:
+                    break
+                (size,) = LEN_HEADER.unpack_from(buf, start)
+                if size > MAX_FRAME:
+                    return -1
+                stop = start + header + size
+                if stop > end:
+                    break
+                frames.append(mv[start + header:stop])
+                start = stop
+            else:
+                idx = buf.find(b"\n", max(start, scan), end)
+                if idx == -1:
+                    break
+                if idx > start:
+                    frames.append(mv[start:idx])
+                start = idx + 1
+        # Separa primeiro, decodifica o lote de uma vez; as fatias são soltas antes de
+        # fechar `mv`, senão o buffer continuaria exportado e não poderia ser redimensionado
+        if frames:
+            _decode_batch(frames, out)
+            frames.clear()
+    return start
+
+
+class AsyncNetClient:
+    """
+    Lado de E/S da conexão: recepção, envio e heartbeat como corrotinas de um
+    único event loop. Cada lote de mensagens decodificadas de um recv é entregue
+    a `on_frames`, chamado no thread do loop.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        on_frames: Callable[[List[Dict[str, object]]], None],
+        length_prefixed: bool = True,
+    ) -> None:
+        self.sock = sock
+        self._on_frames = on_frames
+        # Enquadramento de saída; a entrada aceita os dois
+        self.encode: Callable[[Dict[str, object]], bytes] = encode_frame if length_prefixed else encode_line
+
+        # Só guarda o frame incompleto do fim do último recv; cresce in-place e é
+        # compactado com um único del por recv
+        self.recv_buf = bytearray()
+        # Bloco de leitura reaproveitado por recv_into (evita um bytes novo por recv)
+        self._rx_chunk = bytearray(RECV_CHUNK)
+        self._rx_mv = memoryview(self._rx_chunk)
+
+        # Fila de saída: só a corrotina de envio escreve no socket, agrupando o que acumulou
+        self._tx_q: Deque[bytes] = deque()
+        # O PING é invariável: serializa uma vez só
+        self._ping_frame = self.encode({"type": _PING_T})
+        self._last_tx = 0.0  # loop.time() da última escrita; qualquer frame já prova que estamos vivos
+
+        # Criados dentro do loop em run()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tx_ready: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    # --- chamados no thread do loop ---
+    def enqueue(self, data: bytes) -> None:
+        """Enfileira um frame já serializado e enquadrado (ver `encode`)."""
+        self._tx_q.append(data)
+        if self._tx_ready is not None:
+            self._tx_ready.set()
+
+    def stop(self) -> None:
+        """Pede o encerramento de run()."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self) -> None:
+        """Executa as corrotinas até a conexão cair ou stop() ser chamado."""
+        self._loop = asyncio.get_running_loop()
+        self._tx_ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        if self._tx_q:
+            self._tx_ready.set()
+
+        tasks = [
+            asyncio.ensure_future(self._recv_loop()),
+            asyncio.ensure_future(self._send_loop()),
+            asyncio.ensure_future(self._heartbeat_loop()),
+            asyncio.ensure_future(self._stop.wait()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- corrotinas ---
+    async def _recv_loop(self) -> None:
+        loop = self._loop
+        assert loop is not None
+        while True:
+            try:
+                n = await loop.sock_recv_into(self.sock, self._rx_mv)
+            except OSError:
+                # Erro de socket (reset, fd inválido, etc.)
+                return
+
+            if not n:
+                # Fechamento limpo pelo servidor
+                return
+            if _TCP_QUICKACK is not None:
+                try:
+                    self.sock.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+                except OSError:
+                    pass
+
+            batch: List[Dict[str, object]] = []
+            buf = self.recv_buf
+            if buf:
+                # O resto anterior é um único frame incompleto: um "\n" só pode estar no dado novo
+                scan = len(buf)
+                buf.extend(self._rx_mv[:n])
+                used = _split_frames(buf, len(buf), scan, batch)
+                if used > 0:
+                    del buf[:used]
+            else:
+                # Caso comum: analisa direto do bloco lido; só um frame incompleto é copiado
+                used = _split_frames(self._rx_chunk, n, 0, batch)
+                if 0 <= used < n:
+                    buf.extend(self._rx_mv[used:n])
+            if used < 0 or len(buf) > MAX_FRAME + LEN_HEADER.size:
+                # Frame maior que o limite do protocolo: encerra em vez de acumular
+                return
+            if batch:
+                self._on_frames(batch)
+
+    async def _send_loop(self) -> None:
+        # Drena a fila inteira a cada despertar: N mensagens pendentes, uma única escrita
+        assert self._tx_ready is not None
+        while True:
+            await self._tx_ready.wait()
+            self._tx_ready.clear()
+            batch = list(self._tx_q)
+            self._tx_q.clear()
+            self._last_tx = self._loop.time()  # type: ignore[union-attr]
+            try:
+                await self._write_frames(batch)
+            except OSError:
+                # Erro de envio: encerra; NetClient marca a desconexão
+                return
+
+    async def _heartbeat_loop(self) -> None:
+        # PING só depois de HEARTBEAT_SECONDS sem enviar nada (o servidor conta qualquer
+        # frame como sinal de vida); a tarefa é cancelada quando a conexão encerra
+        loop = self._loop
+        assert loop is not None
+        self._last_tx = loop.time()
+        while True:
+            idle = loop.time() - self._last_tx
+            if idle >= HEARTBEAT_SECONDS:
+                self.enqueue(self._ping_frame)
+                idle = 0.0
+            await asyncio.sleep(HEARTBEAT_SECONDS - idle)
+
+    async def _write_frames(self, frames: List[bytes]) -> None:
+        """Escreve os frames num único syscall (gather-write via sendmsg quando disponível)."""
+        loop = self._loop
+        assert loop is not None
+        if len(frames) == 1 or len(frames) > _IOV_MAX or not hasattr(self.sock, "sendmsg"):
+            await loop.sock_sendall(self.sock, b"".join(frames))
+            return
+        try:
+            sent = self.sock.sendmsg(frames)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        if sent < sum(len(f) for f in frames):
+            # Envio parcial (buffer do kernel cheio): o loop completa quando houver espaço
+            await loop.sock_sendall(self.sock, b"".join(frames)[sent:])
 
 
 class NetClient:
-    def __init__(self, host: str, port: int) -> None:
+    """
+    Conexão do cliente com o servidor, com API síncrona para a UI.
+
+    A E/S roda num AsyncNetClient, dentro de um event loop asyncio num único
+    thread dedicado; send() apenas agenda o frame nesse loop, e poll()/wait_for()
+    leem a caixa de entrada protegida por lock.
+
+    A caixa de entrada é limitada a MAX_INBOX mensagens: se o consumidor parar
+    de chamar poll(), as mais antigas são descartadas e o próximo poll() entrega
+    um OVERFLOW à frente das que sobraram. Deltas e CHATs perdidos não se
+    reconstroem localmente: ao ver o OVERFLOW, quem consome (GameClient) manda
+    SYNC e o STATE completo da resposta restaura grade, chat e campos.
+    """
+
+    def __init__(self, host: str, port: int, length_prefixed: bool = True) -> None:
         self.host = host
         self.port = port
 
@@ -22,100 +268,137 @@ class NetClient:
             self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         except Exception:
             pass
+        # Keepalive/user-timeout do kernel detectam um servidor morto em segundos.
+        # O PING da aplicação continua: o servidor derruba quem fica calado.
+        for name, value in (
+            ("TCP_USER_TIMEOUT", HEARTBEAT_SECONDS * 3 * 1000),
+            ("TCP_KEEPIDLE", HEARTBEAT_SECONDS),
+            ("TCP_KEEPINTVL", HEARTBEAT_SECONDS),
+            ("TCP_KEEPCNT", 2),
+        ):
+            if hasattr(socket, name):
+                try:
+                    self.sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), max(1, int(value)))
+                except OSError:
+                    pass
+        # Buffers fixados antes do connect (a janela TCP é negociada no handshake); lances e
+        # chat saem marcados como baixa latência, como o servidor faz no sentido oposto
+        for level, opt, value in (
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_RCVBUF),
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_SNDBUF),
+            (socket.IPPROTO_IP, socket.IP_TOS, _IPTOS_LOWDELAY),
+        ):
+            try:
+                self.sock.setsockopt(level, opt, value)
+            except OSError:
+                pass
 
-        # Timeout inicial só para a conexão; depois ajustamos para recv
+        # Timeout só para a conexão; depois o socket passa a ser não bloqueante (asyncio)
         self.sock.settimeout(10.0)
         self.sock.connect((host, port))
-        # Timeout de operação normal (coerente com o servidor)
-        self.sock.settimeout(HEARTBEAT_SECONDS * 3)
+        self.sock.setblocking(False)
 
-        self.recv_buf = b""
         self.lock = threading.Lock()        # protege inbox e estado de desconexão
-        self.send_lock = threading.Lock()   # serializa envios para evitar interleaving
-        self.inbox: List[Dict[str, object]] = []
+        self.cond = threading.Condition(self.lock)  # acorda quem aguarda em wait_for
+        self.inbox: Deque[Dict[str, object]] = deque(maxlen=MAX_INBOX)
+        self._overflow = False              # houve descarte desde o último poll()
+        self._rx_total = 0                  # total já enfileirado (posição absoluta p/ wait_for)
         self._closed = False
         self._disconnect_posted = False
 
-        threading.Thread(target=self._recv_loop, daemon=True).start()
-        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        self._loop = asyncio.new_event_loop()
+        self._aio = AsyncNetClient(self.sock, self._deliver, length_prefixed)
+        self._encode = self._aio.encode
+        threading.Thread(target=self._run_loop, daemon=True).start()
 
     # --- API pública ---
     def send(self, obj: Dict[str, object]) -> bool:
         """
-        Envia um objeto JSON com newline framing.
-        Retorna True se enviou, False se a conexão já caiu/erro ao enviar.
+        Enfileira um objeto JSON para o loop de envio, com prefixo de tamanho
+        (ou newline, em modo legado). Retorna True se enfileirou, False se a conexão já caiu.
         """
-        if self._closed:
-            return False
-        line = json.dumps(obj, separators=(",", ":")) + "\n"
-        data = line.encode("utf-8")
-        try:
-            with self.send_lock:
-                self.sock.sendall(data)
-            return True
-        except OSError:
-            # Marca desconexão e avisa consumidores
-            self._mark_disconnected()
-            return False
+        return self._send_raw(self._encode(obj))
 
     def poll(self) -> List[Dict[str, object]]:
         """Retorna e limpa a caixa de mensagens recebidas."""
         with self.lock:
-            msgs = self.inbox
-            self.inbox = []
+            msgs = list(self.inbox)
+            self.inbox.clear()
+            if self._overflow:
+                # Sinalizado aqui, e não dentro da caixa: lá ele próprio poderia ser descartado
+                self._overflow = False
+                msgs.insert(0, {"type": _OVERFLOW_T})
         return msgs
 
+    def wait_for(self, mtype: str, timeout: float = 5.0) -> Optional[Dict[str, object]]:
+        """
+        Bloqueia até chegar uma mensagem do tipo `mtype` (ou estourar `timeout`).
+        A mensagem não é removida da caixa: o próximo poll() ainda a entrega.
+        Retorna None em caso de timeout ou desconexão.
+        """
+        end = time.monotonic() + timeout
+        with self.cond:
+            seen = self._rx_total - len(self.inbox)
+            while True:
+                # posição absoluta do inbox[0]; poll() pode ter esvaziado a caixa
+                base = self._rx_total - len(self.inbox)
+                for m in islice(self.inbox, max(0, seen - base), None):
+                    if m.get("type") == mtype:
+                        return m
+                seen = self._rx_total
+                remaining = end - time.monotonic()
+                if self._closed or remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+
+    def is_connected(self) -> bool:
+        """
+        Indica se a conexão ainda está ativa, sem tomar `self.lock`.
+        A escrita de `_closed` acontece sob o lock em _mark_disconnected; aqui a
+        leitura é uma dica (pode ficar um ciclo atrasada), suficiente para quem
+        volta a consultar no próximo laço.
+        """
+        return not self._closed
+
     def close(self) -> None:
         """Fecha a conexão de forma idempotente."""
         self._mark_disconnected()
 
-    # --- loops internos ---
-    def _recv_loop(self) -> None:
+    # --- thread do event loop ---
+    def _run_loop(self) -> None:
         try:
-            while not self._closed:
-                try:
-                    data = self.sock.recv(4096)
-                except socket.timeout:
-                    # Sem dados nesse intervalo; segue aguardando
-                    continue
-                except OSError:
-                    # Erro de socket (reset, fd inválido, etc.)
-                    break
-
-                if not data:
-                    # Fechamento limpo pelo servidor
-                    break
-
-                self.recv_buf += data
-                while b"\n" in self.recv_buf:
-                    line, self.recv_buf = self.recv_buf.split(b"\n", 1)
-                    if not line:
-                        continue
-                    try:
-                        msg = json.loads(line.decode("utf-8"))
-                    except Exception:
-                        # Linha inválida: ignora
-                        continue
-                    with self.lock:
-                        self.inbox.append(msg)
+            self._loop.run_until_complete(self._aio.run())
         finally:
             self._mark_disconnected()
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self._loop.close()
 
-    def _heartbeat_loop(self) -> None:
-        # Envia PING periódico; se falhar, encerra
-        while not self._closed:
-            time.sleep(HEARTBEAT_SECONDS)
-            # Se já caiu, para
-            if self._closed:
-                break
-            ok = self.send({"type": MsgType.PING.value})
-            if not ok:
-                # send() já marca desconexão; apenas sair
-                break
+    def _deliver(self, batch: List[Dict[str, object]]) -> None:
+        # Uma única seção crítica para todos os frames de um recv
+        with self.lock:
+            if len(self.inbox) + len(batch) > MAX_INBOX:
+                self._overflow = True
+            self.inbox.extend(batch)
+            self._rx_total += len(batch)
+            self.cond.notify_all()
 
     # --- utilitários internos ---
+    def _send_raw(self, data: bytes) -> bool:
+        """Agenda um frame já serializado no loop de envio."""
+        if self._closed:
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._aio.enqueue, data)
+        except RuntimeError:
+            # Loop já encerrado
+            return False
+        return True
+
     def _mark_disconnected(self) -> None:
-        """Marca desconexão, posta DISCONNECT uma única vez e fecha o socket com segurança."""
+        """Marca desconexão, posta DISCONNECT uma única vez e encerra o loop de E/S."""
         with self.lock:
             if self._closed:
                 return
@@ -123,15 +406,16 @@ class NetClient:
 
             if not self._disconnect_posted:
                 self._disconnect_posted = True
-                self.inbox.append({"type": MsgType.DISCONNECT.value})
+                self.inbox.append({"type": _DISCONNECT_T})
+                self._rx_total += 1
+            self.cond.notify_all()
 
-        # Tenta encerrar o socket sem gerar exceções entre threads
         try:
-            self.sock.shutdown(socket.SHUT_RDWR)
-        except Exception:
+            self._loop.call_soon_threadsafe(self._aio.stop)
+        except RuntimeError:
             pass
+        # shutdown é seguro entre threads; o fechamento do fd fica com o thread do loop
         try:
-            self.sock.close()
+            self.sock.shutdown(socket.SHUT_RDWR)
         except Exception:
             pass
-
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Set, Tuple
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
 
 import pygame  # type: ignore
 
-from ..board import Board, compute_moves
+from ..board import CAMP_A, CAMP_B, Board, compute_move_masks, mask_indices
 from ..config import (
     BG_COLOR,
     BOARD_W,
@@ -12,7 +13,9 @@ from ..config import (
     GRID_COLOR,
     H,
     INPUT_BG,
+    MAX_CHAT_HISTORY,
     MUTED_TEXT,
+    N,
     PANEL_ACCENT,
     PANEL_BG,
     P1_COLOR,
@@ -27,33 +30,91 @@ from ..config import (
 from ..protocol import Cell, MsgType
 from .net import NetClient
 
+# Superfícies de texto e quebras de linha guardadas (LRU): o chat é redesenhado a cada quadro
+_TEXT_CACHE_MAX = 512
+
+# ASCII imprimível + o que a interface e o chat em português mais usam
+_WARM_GLYPHS = "".join(chr(i) for i in range(32, 127)) + "áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ…✓•"
+
+# Um STATE traz a grade e o chat inteiros: STATEs, deltas e CHATs anteriores no mesmo lote são redundantes
+_STATE_T = MsgType.STATE.value
+_SUPERSEDED_BY_STATE = frozenset({MsgType.STATE.value, MsgType.STATE_DELTA.value, MsgType.CHAT.value})
+
+# Canto superior esquerdo de cada casa, por índice linear r * N + c
+_TILE_ORIGIN: Tuple[Tuple[int, int], ...] = tuple(((i % N) * TILE, (i // N) * TILE) for i in range(N * N))
+
+# Retângulos fixos dos destaques (lance simples, salto, seleção), por índice linear
+_SIMPLE_RECTS: Tuple[pygame.Rect, ...] = tuple(pygame.Rect(x + 8, y + 8, TILE - 16, TILE - 16) for x, y in _TILE_ORIGIN)
+_JUMP_RECTS: Tuple[pygame.Rect, ...] = tuple(pygame.Rect(x + 4, y + 4, TILE - 8, TILE - 8) for x, y in _TILE_ORIGIN)
+_SEL_RECTS: Tuple[pygame.Rect, ...] = tuple(pygame.Rect(x + 2, y + 2, TILE - 4, TILE - 4) for x, y in _TILE_ORIGIN)
+
+# Geometria da sidebar (coordenadas relativas ao painel)
+_HEADER_H = 56
+_INPUT_H = 36
+_PAD = 10
+_CHAT_TOP = _HEADER_H + 26
+_CHAT_H = H - _CHAT_TOP - _INPUT_H - _PAD * 2
+
 
 class GameClient:
-    def __init__(self, host: str = "127.0.0.1", port: int = 50007) -> None:
+    def __init__(self, host: str = "127.0.0.1", port: int = 50007, length_prefixed: bool = True) -> None:
         pygame.init()
         pygame.display.set_caption("Halma Online - Cliente")
-        self.screen = pygame.display.set_mode((W, H))
+        try:
+            # SCALED apresenta a tela por um renderer SDL (textura na GPU quando houver) com vsync
+            self.screen = pygame.display.set_mode((W, H), pygame.SCALED | pygame.DOUBLEBUF, vsync=1)
+        except pygame.error:
+            # Driver sem suporte a vsync/renderer: janela comum por software
+            self.screen = pygame.display.set_mode((W, H))
         self.font = pygame.font.SysFont("arial", 16)
         self.font_small = pygame.font.SysFont("arial", 14)
         self.big_font = pygame.font.SysFont("arial", 20, bold=True)
+        for font in (self.font, self.font_small, self.big_font):
+            # Aquece o cache de glifos uma vez (um render da faixa inteira, não um por caractere)
+            font.render(_WARM_GLYPHS, True, TEXT_COLOR)
+            font.metrics(_WARM_GLYPHS)
         self.clock = pygame.time.Clock()
-        self.client = NetClient(host, port)
+        self.client = NetClient(host, port, length_prefixed)
 
         self.player_id: Optional[int] = None
         self.board = Board()
         self.turn: int = Cell.P1
         self.winner: Optional[int] = None
-        self.chat_messages: List[Dict[str, object]] = []
+        # Mesmo limite do histórico do servidor: mensagens antigas saem em O(1)
+        self.chat_messages: Deque[Dict[str, object]] = deque(maxlen=MAX_CHAT_HISTORY)
         self.players_present: Dict[str, bool] = {"p1": False, "p2": False}
         self.jump_lock: Optional[Dict[str, object]] = None
         self.reset_votes: Dict[str, bool] = {"p1": False, "p2": False}
+        # Derivados de jump_lock/reset_votes, recalculados uma vez por STATE
+        self._my_lock: Optional[Tuple[int, int]] = None  # casa da cadeia de saltos, se for minha
+        self._rv_p1 = self._rv_p2 = False
+        self.state_seq: Optional[int] = None  # sequência do último STATE aplicado (base dos deltas)
+        self.sync_pending = False
 
         self.selected: Optional[Tuple[int, int]] = None
-        self.valid_simple: Set[Tuple[int, int]] = set()
-        self.valid_jump: Set[Tuple[int, int]] = set()
+        # Destinos da peça selecionada como bitmasks (bit r * N + c)
+        self.valid_simple = 0
+        self.valid_jump = 0
+        # Destinos por peça, válidos até a próxima mudança da grade (STATE/STATE_DELTA)
+        self._moves_cache: Dict[Tuple[int, int], Tuple[int, int]] = {}
         self.current_input: str = ""
         self.chat_scroll: int = 0
+        # Revisão do chat (incrementada a cada mudança) e as linhas quebradas da última revisão
+        self._chat_rev = 0
+        self._lines_key: Tuple[int, int] = (-1, 0)
+        self._lines: List[Tuple[str, str, Tuple[int, ...]]] = []
         self.status_msg: str = "Conectando..."
+        # Chaveados pelo id da fonte: as fontes são criadas uma vez e nunca trocam
+        self._text_cache: "OrderedDict[Tuple[int, str, Tuple[int, ...]], pygame.Surface]" = OrderedDict()
+        self._wrap_cache: "OrderedDict[Tuple[int, str, int], List[str]]" = OrderedDict()
+        self._build_static_layers()
+
+    def moves_for(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        """compute_move_masks memoizado enquanto a grade não muda."""
+        moves = self._moves_cache.get(pos)
+        if moves is None:
+            moves = self._moves_cache[pos] = compute_move_masks(self.board, pos)
+        return moves
 
     def board_to_screen(self, r: int, c: int) -> Tuple[int, int]:
         return c * TILE + TILE // 2, r * TILE + TILE // 2
@@ -64,7 +125,33 @@ class GameClient:
         r, c = y // TILE, x // TILE
         return int(r), int(c)
 
+    def render_text(self, font: pygame.font.Font, text: str, color: Sequence[int]) -> pygame.Surface:
+        """font.render com cache LRU; a superfície devolvida é compartilhada, não deve ser alterada."""
+        key = (id(font), text, tuple(color))
+        cache = self._text_cache
+        surf = cache.get(key)
+        if surf is None:
+            surf = cache[key] = font.render(text, True, color)
+            if len(cache) > _TEXT_CACHE_MAX:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return surf
+
     def wrap_text(self, text: str, max_width: int, font: pygame.font.Font) -> List[str]:
+        key = (id(font), text, max_width)
+        cache = self._wrap_cache
+        lines = cache.get(key)
+        if lines is None:
+            lines = cache[key] = self._wrap_text(text, max_width, font)
+            if len(cache) > _TEXT_CACHE_MAX:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return lines
+
+    @staticmethod
+    def _wrap_text(text: str, max_width: int, font: pygame.font.Font) -> List[str]:
         words = text.split(" ")
         lines: List[str] = []
         cur = ""
@@ -81,62 +168,115 @@ class GameClient:
             lines.append(cur)
         return lines
 
+    def _build_static_layers(self) -> None:
+        """Desenha uma vez o que nunca muda: fundo do tabuleiro (campos + grade), painel da sidebar,
+        sprites das peças e o véu do fim de partida."""
+        bg = pygame.Surface((BOARD_W, H)).convert()
+        bg.fill(BG_COLOR)
+        for r, c in CAMP_A:
+            pygame.draw.rect(bg, (60, 60, 120), (c * TILE, r * TILE, TILE, TILE))
+        for r, c in CAMP_B:
+            pygame.draw.rect(bg, (120, 60, 60), (c * TILE, r * TILE, TILE, TILE))
+        for i in range((H // TILE) + 1):
+            pygame.draw.line(bg, GRID_COLOR, (0, i * TILE), (BOARD_W, i * TILE), 1)
+        for i in range((BOARD_W // TILE) + 1):
+            pygame.draw.line(bg, GRID_COLOR, (i * TILE, 0), (i * TILE, H), 1)
+        self._board_bg = bg
+
+        chrome = pygame.Surface((CHAT_W, H)).convert()
+        chrome.fill(PANEL_BG)
+        pygame.draw.rect(chrome, PANEL_ACCENT, (0, 0, CHAT_W, _HEADER_H))
+        pygame.draw.rect(chrome, (32, 34, 40), (_PAD, _CHAT_TOP, CHAT_W - _PAD * 2, _CHAT_H), border_radius=8)
+        input_rect = pygame.Rect(_PAD, H - _PAD - _INPUT_H, CHAT_W - _PAD * 2, _INPUT_H)
+        pygame.draw.rect(chrome, INPUT_BG, input_rect, border_radius=8)
+        pygame.draw.rect(chrome, PANEL_ACCENT, input_rect, 1, border_radius=8)
+        self._sidebar_chrome = chrome
+
+        self._piece_surf: Dict[int, pygame.Surface] = {}
+        for v, color in ((Cell.P1, P1_COLOR), (Cell.P2, P2_COLOR)):
+            piece = pygame.Surface((TILE, TILE), pygame.SRCALPHA)
+            pygame.draw.circle(piece, color, (TILE // 2, TILE // 2), TILE // 2 - 4)
+            self._piece_surf[v] = piece.convert_alpha()
+        self._board_layer = bg.copy()
+        self._board_dirty = True
+
+        dim = pygame.Surface((BOARD_W, H), pygame.SRCALPHA)
+        dim.fill((0, 0, 0, 140))
+        self._dim_overlay = dim.convert_alpha()
+
+    def _rebuild_board_layer(self) -> None:
+        layer = self._board_layer
+        layer.blit(self._board_bg, (0, 0))
+        sprites = self._piece_surf
+        origin = _TILE_ORIGIN
+        # Um único blits() para todas as peças, em vez de uma chamada Python→C por casa
+        layer.blits([(sprites[v], origin[i]) for i, v in enumerate(self.board.grid) if v], False)
+        self._board_dirty = False
+
+    def _chat_lines(self, width: int) -> List[Tuple[str, str, Tuple[int, ...]]]:
+        """Linhas (rótulo, texto, cor) do chat já quebradas; refeitas só quando o chat muda."""
+        if self._lines_key == (self._chat_rev, width):
+            return self._lines
+        lines: List[Tuple[str, str, Tuple[int, ...]]] = []
+        for m in self.chat_messages:
+            player = m.get("player")
+            name = "Jogador 1" if player == Cell.P1 else ("Jogador 2" if player == Cell.P2 else "Sistema")
+            color = P1_COLOR if player == Cell.P1 else (P2_COLOR if player == Cell.P2 else MUTED_TEXT)
+            label = f"{name}: "
+            # Mede pela própria superfície do rótulo: o mesmo item do cache é reusado no blit
+            label_w = self.render_text(self.font_small, label, color).get_width()
+            max_text_w = width - label_w
+            wrapped = self.wrap_text(str(m.get("text", "")), max_text_w, self.font_small)
+            if wrapped:
+                lines.append((label, wrapped[0], color))
+                for cont in wrapped[1:]:
+                    lines.append(("", cont, color))
+            else:
+                lines.append((label, "", color))
+        self._lines_key = (self._chat_rev, width)
+        self._lines = lines
+        return lines
+
     # --- Desenho da sidebar ---
     def draw_sidebar(self) -> None:
         x0 = BOARD_W
-        pygame.draw.rect(self.screen, PANEL_BG, (x0, 0, CHAT_W, H))
-        header_h = 56
-        pygame.draw.rect(self.screen, PANEL_ACCENT, (x0, 0, CHAT_W, header_h))
+        self.screen.blit(self._sidebar_chrome, (x0, 0))
 
         pid_name = {Cell.P1: "Jogador 1", Cell.P2: "Jogador 2", None: "Espectador"}[self.player_id]
         name_color = P1_COLOR if self.player_id == Cell.P1 else (P2_COLOR if self.player_id == Cell.P2 else TEXT_COLOR)
-        hdr = self.big_font.render(f"Você: {pid_name}", True, name_color)
+        hdr = self.render_text(self.big_font, f"Você: {pid_name}", name_color)
         self.screen.blit(hdr, (x0 + 12, 8))
 
         turn_text = "Vez: J1" if self.turn == Cell.P1 else "Vez: J2"
         tcolor = P1_COLOR if self.turn == Cell.P1 else P2_COLOR
-        self.screen.blit(self.font.render(turn_text, True, tcolor), (x0 + 12, 30))
+        self.screen.blit(self.render_text(self.font, turn_text, tcolor), (x0 + 12, 30))
 
         p1s = "online" if self.players_present.get("p1") else "aguardando"
         p2s = "online" if self.players_present.get("p2") else "aguardando"
-        self.screen.blit(self.font_small.render(f"J1: {p1s}", True, MUTED_TEXT), (x0 + 180, 10))
-        self.screen.blit(self.font_small.render(f"J2: {p2s}", True, MUTED_TEXT), (x0 + 180, 26))
+        self.screen.blit(self.render_text(self.font_small, f"J1: {p1s}", MUTED_TEXT), (x0 + 180, 10))
+        self.screen.blit(self.render_text(self.font_small, f"J2: {p2s}", MUTED_TEXT), (x0 + 180, 26))
 
         y_hint = 40
-        if self.jump_lock and self.jump_lock.get("player") == self.player_id:
-            self.screen.blit(self.font_small.render("Cadeia de saltos ativa: ESPAÇO encerra", True, MUTED_TEXT), (x0 + 12, y_hint))
+        if self._my_lock:
+            self.screen.blit(self.render_text(self.font_small, "Cadeia de saltos ativa: ESPAÇO encerra", MUTED_TEXT), (x0 + 12, y_hint))
             y_hint += 14
 
-        rv_p1, rv_p2 = self.reset_votes.get("p1", False), self.reset_votes.get("p2", False)
+        rv_p1, rv_p2 = self._rv_p1, self._rv_p2
         if rv_p1 or rv_p2:
             s = "Pedidos de reset: "
             s += ("J1✓ " if rv_p1 else "J1… ") + ("J2✓" if rv_p2 else "J2…")
-            self.screen.blit(self.font_small.render(s, True, MUTED_TEXT), (x0 + 12, y_hint))
+            self.screen.blit(self.render_text(self.font_small, s, MUTED_TEXT), (x0 + 12, y_hint))
             y_hint += 14
 
-        self.screen.blit(self.font_small.render("D: desistir  •  R: solicitar reinício", True, MUTED_TEXT), (x0 + 12, y_hint))
+        self.screen.blit(self.render_text(self.font_small, "D: desistir  •  R: solicitar reinício", MUTED_TEXT), (x0 + 12, y_hint))
 
-        input_h = 36
-        pad = 10
-        chat_top = header_h + 26
-        chat_h = H - chat_top - input_h - pad * 2
+        input_h = _INPUT_H
+        pad = _PAD
+        chat_top = _CHAT_TOP
+        chat_h = _CHAT_H
         messages_rect = pygame.Rect(x0 + pad, chat_top, CHAT_W - pad * 2, chat_h)
-        pygame.draw.rect(self.screen, (32, 34, 40), messages_rect, border_radius=8)
 
-        lines: List[Tuple[str, str, Optional[int]]] = []
-        for m in self.chat_messages[-300:]:
-            player = m.get("player")
-            name = "Jogador 1" if player == Cell.P1 else ("Jogador 2" if player == Cell.P2 else "Sistema")
-            label = f"{name}: "
-            label_w, _ = self.font_small.size(label)
-            max_text_w = messages_rect.width - 8 - label_w
-            wrapped = self.wrap_text(str(m.get("text", "")), max_text_w, self.font_small)
-            if wrapped:
-                lines.append((label, wrapped[0], int(player) if isinstance(player, int) else None))
-                for cont in wrapped[1:]:
-                    lines.append(("", cont, int(player) if isinstance(player, int) else None))
-            else:
-                lines.append((label, "", int(player) if isinstance(player, int) else None))
+        lines = self._chat_lines(messages_rect.width - 8)
 
         line_h = 18
         total_h = len(lines) * line_h
@@ -145,47 +285,45 @@ class GameClient:
 
         clip_prev = self.screen.get_clip()
         self.screen.set_clip(messages_rect)
-        y = chat_top + 4 - self.chat_scroll
-        for label, text, player in lines:
-            color = P1_COLOR if player == Cell.P1 else (P2_COLOR if player == Cell.P2 else MUTED_TEXT)
+        # Só as linhas que caem na janela: a altura de linha é fixa, então o intervalo sai direto do scroll
+        first = max(0, (self.chat_scroll - 4) // line_h)
+        last = min(len(lines), (self.chat_scroll + chat_h) // line_h + 1)
+        y = chat_top + 4 - self.chat_scroll + first * line_h
+        for label, text, color in lines[first:last]:
             if label:
-                lbl = self.font_small.render(label, True, color)
+                lbl = self.render_text(self.font_small, label, color)
                 self.screen.blit(lbl, (x0 + pad + 6, y))
-                label_w, _ = self.font_small.size(label)
-                txt = self.font_small.render(text, True, TEXT_COLOR)
+                label_w = lbl.get_width()
+                txt = self.render_text(self.font_small, text, TEXT_COLOR)
                 self.screen.blit(txt, (x0 + pad + 6 + label_w, y))
             else:
-                txt = self.font_small.render(text, True, TEXT_COLOR)
+                txt = self.render_text(self.font_small, text, TEXT_COLOR)
                 self.screen.blit(txt, (x0 + pad + 6, y))
             y += line_h
         self.screen.set_clip(clip_prev)
 
         input_rect = pygame.Rect(x0 + pad, H - pad - input_h, CHAT_W - pad * 2, input_h)
-        pygame.draw.rect(self.screen, INPUT_BG, input_rect, border_radius=8)
-        pygame.draw.rect(self.screen, PANEL_ACCENT, input_rect, 1, border_radius=8)
         prefix = "> "
-        prefix_surf = self.font.render(prefix, True, MUTED_TEXT)
+        prefix_surf = self.render_text(self.font, prefix, MUTED_TEXT)
         self.screen.blit(prefix_surf, (input_rect.x + 8, input_rect.y + 8))
-        txt = self.font.render(self.current_input, True, TEXT_COLOR)
+        txt = self.render_text(self.font, self.current_input, TEXT_COLOR)
         self.screen.blit(txt, (input_rect.x + 8 + prefix_surf.get_width(), input_rect.y + 8))
 
         if self.status_msg:
-            self.screen.blit(self.font_small.render(self.status_msg, True, MUTED_TEXT), (x0 + 12, H - input_h - pad - 18))
+            self.screen.blit(self.render_text(self.font_small, self.status_msg, MUTED_TEXT), (x0 + 12, H - input_h - pad - 18))
 
     def draw_winner_overlay(self) -> None:
         if not self.winner:
             return
-        overlay = pygame.Surface((BOARD_W, H), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 140))
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self._dim_overlay, (0, 0))
 
         winner_num = 1 if self.winner == Cell.P1 else 2
         last_text = (self.chat_messages[-1].get("text") if self.chat_messages else "") or ""
         by_resign = isinstance(last_text, str) and "desistiu" in last_text.lower()
 
         title_text = f"Vitória do Jogador {winner_num}!" + (" (por desistência)" if by_resign else "")
-        title = self.big_font.render(title_text, True, (255, 255, 255))
-        tip = self.font.render("Pressione R para solicitar reinício (ambos devem aceitar)", True, (230, 230, 230))
+        title = self.render_text(self.big_font, title_text, (255, 255, 255))
+        tip = self.render_text(self.font, "Pressione R para solicitar reinício (ambos devem aceitar)", (230, 230, 230))
 
         box_w = max(title.get_width(), tip.get_width()) + 40
         box_h = title.get_height() + tip.get_height() + 28
@@ -201,36 +339,20 @@ class GameClient:
         self.screen.blit(tip, (box_x + (box_w - tip.get_width()) // 2, box_y + 14 + title.get_height()))
 
     def draw_board(self) -> None:
-        self.screen.fill(BG_COLOR)
-        from ..board import CAMP_A, CAMP_B  # import leve para pintar campos
-        for r, c in CAMP_A:
-            pygame.draw.rect(self.screen, (60, 60, 120), (c * TILE, r * TILE, TILE, TILE))
-        for r, c in CAMP_B:
-            pygame.draw.rect(self.screen, (120, 60, 60), (c * TILE, r * TILE, TILE, TILE))
-
-        for i in range((self.screen.get_height() // TILE) + 1):
-            pygame.draw.line(self.screen, GRID_COLOR, (0, i * TILE), (self.screen.get_width() - CHAT_W, i * TILE), 1)
-        for i in range(((self.screen.get_width() - CHAT_W) // TILE) + 1):
-            pygame.draw.line(self.screen, GRID_COLOR, (i * TILE, 0), (i * TILE, self.screen.get_height()), 1)
-
-        for r in range(self.screen.get_height() // TILE):
-            for c in range((self.screen.get_width() - CHAT_W) // TILE):
-                if r >= 16 or c >= 16:
-                    continue
-                v = self.board.cell(r, c)
-                if v != Cell.EMPTY:
-                    color = P1_COLOR if v == Cell.P1 else P2_COLOR
-                    x, y = self.board_to_screen(r, c)
-                    pygame.draw.circle(self.screen, color, (x, y), TILE // 2 - 4)
-
-        for r, c in self.valid_simple:
-            pygame.draw.rect(self.screen, (120, 200, 255), (c * TILE + 8, r * TILE + 8, TILE - 16, TILE - 16), border_radius=6)
-        for r, c in self.valid_jump:
-            pygame.draw.rect(self.screen, (120, 255, 160), (c * TILE + 4, r * TILE + 4, TILE - 8, TILE - 8), 2, border_radius=8)
+        # Fundo, grade e peças saem de uma camada só, refeita apenas quando a grade muda
+        if self._board_dirty:
+            self._rebuild_board_layer()
+        self.screen.blit(self._board_layer, (0, 0))
+
+        screen = self.screen
+        for i in mask_indices(self.valid_simple):
+            pygame.draw.rect(screen, (120, 200, 255), _SIMPLE_RECTS[i], border_radius=6)
+        for i in mask_indices(self.valid_jump):
+            pygame.draw.rect(screen, (120, 255, 160), _JUMP_RECTS[i], 2, border_radius=8)
 
         if self.selected:
             r, c = self.selected
-            pygame.draw.rect(self.screen, SEL_COLOR, (c * TILE + 2, r * TILE + 2, TILE - 4, TILE - 4), 3, border_radius=8)
+            pygame.draw.rect(screen, SEL_COLOR, _SEL_RECTS[r * N + c], 3, border_radius=8)
 
         self.draw_winner_overlay()
         self.draw_sidebar()
@@ -250,23 +372,24 @@ class GameClient:
         if cell is None:
             return
         r, c = cell
+        bit = 1 << (r * N + c)
 
-        if self.jump_lock and self.jump_lock.get("player") == self.player_id:
-            lock_pos = tuple(self.jump_lock.get("pos", []))
+        lock_pos = self._my_lock
+        if lock_pos:
             if self.selected is None:
                 if (r, c) == lock_pos:
                     self.selected = lock_pos
-                    _, self.valid_jump = compute_moves(self.board, self.selected)
-                    self.valid_simple = set()
+                    _, self.valid_jump = self.moves_for(self.selected)
+                    self.valid_simple = 0
                 else:
                     self.status_msg = "Continue a cadeia com a peça destacada ou ESPAÇO para encerrar."
             else:
                 dest = (r, c)
-                if dest in self.valid_jump:
+                if self.valid_jump & bit:
                     self.client.send({"type": MsgType.MOVE.value, "src": list(self.selected), "dst": list(dest)})
                 elif dest == self.selected:
                     self.selected = None
-                    self.valid_jump = set()
+                    self.valid_jump = 0
                 else:
                     self.status_msg = "Apenas saltos são permitidos."
             return
@@ -274,21 +397,21 @@ class GameClient:
         if self.selected is None:
             if self.board.cell(r, c) == self.player_id:
                 self.selected = (r, c)
-                self.valid_simple, self.valid_jump = compute_moves(self.board, self.selected)
+                self.valid_simple, self.valid_jump = self.moves_for(self.selected)
             else:
                 return
         else:
             dest = (r, c)
             if dest == self.selected:
                 self.selected = None
-                self.valid_simple, self.valid_jump = set(), set()
+                self.valid_simple = self.valid_jump = 0
                 return
-            if dest in self.valid_simple or dest in self.valid_jump:
+            if (self.valid_simple | self.valid_jump) & bit:
                 self.client.send({"type": MsgType.MOVE.value, "src": list(self.selected), "dst": list(dest)})
             else:
                 if self.board.cell(r, c) == self.player_id:
                     self.selected = (r, c)
-                    self.valid_simple, self.valid_jump = compute_moves(self.board, self.selected)
+                    self.valid_simple, self.valid_jump = self.moves_for(self.selected)
 
     def post_chat(self) -> None:
         text = self.current_input.strip()
@@ -307,7 +430,7 @@ class GameClient:
             else:
                 self.status_msg = "Somente jogadores podem solicitar reinício."
         elif event.key == pygame.K_SPACE:
-            if self.jump_lock and self.jump_lock.get("player") == self.player_id:
+            if self._my_lock:
                 self.client.send({"type": MsgType.ENDJUMP.value})
         elif event.key == pygame.K_d:
             if self.player_id in (Cell.P1, Cell.P2) and not self.winner:
@@ -322,6 +445,18 @@ class GameClient:
             self.chat_scroll = max(0, self.chat_scroll - event.y * 24)
 
     # --- Rede -> UI ---
+    def on_messages(self, msgs: List[Dict[str, object]]) -> None:
+        """Aplica um lote do poll(); o que vem antes do último STATE e ele já contém é pulado."""
+        last = -1
+        for i in range(len(msgs) - 1, -1, -1):
+            if msgs[i].get("type") == _STATE_T:
+                last = i
+                break
+        for i, msg in enumerate(msgs):
+            if i < last and msg.get("type") in _SUPERSEDED_BY_STATE:
+                continue
+            self.on_message(msg)
+
     def on_message(self, msg: Dict[str, object]) -> None:
         t = msg.get("type")
         if t == MsgType.JOIN.value:
@@ -330,43 +465,45 @@ class GameClient:
                 "Conectado. Aguarde outro jogador." if self.player_id in (Cell.P1, Cell.P2) else "Sala cheia (espectador)."
             )
         elif t == MsgType.STATE.value:
-            self.board = Board.deserialize(msg.get("board"))  # type: ignore[arg-type]
-            self.turn = int(msg.get("turn"))
-            self.winner = msg.get("winner")  # type: ignore[assignment]
-            self.chat_messages = msg.get("chat", [])  # type: ignore[assignment]
-            self.players_present = msg.get("players", self.players_present)  # type: ignore[assignment]
-            self.jump_lock = msg.get("jump_lock")  # type: ignore[assignment]
-            self.reset_votes = msg.get("reset_votes", self.reset_votes)  # type: ignore[assignment]
-
-            if self.player_id in (Cell.P1, Cell.P2):
-                mine = "p1" if self.player_id == Cell.P1 else "p2"
-                other = "p2" if mine == "p1" else "p1"
-                if self.reset_votes.get(mine) and not self.reset_votes.get(other):
-                    self.status_msg = "Pedido de reinício enviado. Aguardando o outro jogador…"
-                elif self.reset_votes.get(mine) and self.reset_votes.get(other):
-                    self.status_msg = "Partida reiniciada (consenso)."
-                else:
-                    if not self.winner:
-                        self.status_msg = ""
-
-            if self.jump_lock and self.jump_lock.get("player") == self.player_id:
-                lock_pos = tuple(self.jump_lock.get("pos", []))
-                self.selected = lock_pos
-                _, self.valid_jump = compute_moves(self.board, self.selected)
-                self.valid_simple = set()
-                self.status_msg = "Cadeia de saltos ativa. Use ESPAÇO para encerrar."
-            else:
-                if self.selected:
-                    if self.board.cell(self.selected[0], self.selected[1]) != (self.player_id or 0):
-                        self.selected = None
-                        self.valid_simple, self.valid_jump = set(), set()
-                    else:
-                        self.valid_simple, self.valid_jump = compute_moves(self.board, self.selected)
-                if self.winner:
-                    self.status_msg = f"Vitória do Jogador {1 if self.winner == Cell.P1 else 2}"
+            wire = msg.get("board")
+            # Resposta a SYNC ou STATE que só mexe nos campos: a grade costuma ser a mesma,
+            # e comparar a string base64 evita refazer tabuleiro, cache de lances e camada
+            if wire != self.board.serialize():
+                self.board = Board.deserialize(wire)  # type: ignore[arg-type]
+                self._moves_cache.clear()
+                self._board_dirty = True
+            self.chat_messages.clear()
+            self.chat_messages.extend(msg.get("chat", []))  # type: ignore[arg-type]
+            self._chat_rev += 1
+            self.sync_pending = False
+            self.apply_state_fields(msg)
+
+        elif t == MsgType.STATE_DELTA.value:
+            if msg.get("base") != self.state_seq:
+                # Perdemos um STATE no caminho: o delta não se aplica, pede o completo
+                if not self.sync_pending:
+                    self.sync_pending = True
+                    self.client.send({"type": MsgType.SYNC.value})
+                return
+            changes = msg.get("changes", [])
+            for idx, v in changes:  # type: ignore[union-attr]
+                self.board.set_cell(idx // N, idx % N, v)
+            if changes:
+                self._moves_cache.clear()
+                self._board_dirty = True
+            if msg.get("chat"):
+                self.chat_messages.extend(msg["chat"])  # type: ignore[arg-type]
+                self._chat_rev += 1
+            self.apply_state_fields(msg)
 
         elif t == MsgType.CHAT.value:
             self.chat_messages.append({"player": msg.get("player"), "text": msg.get("text", "")})
+            self._chat_rev += 1
+        elif t == MsgType.OVERFLOW.value:
+            # Mensagens descartadas na caixa de entrada (deltas, chats): só o STATE completo repõe tudo
+            if not self.sync_pending:
+                self.sync_pending = True
+                self.client.send({"type": MsgType.SYNC.value})
         elif t == MsgType.ERROR.value:
             self.status_msg = f"Erro: {msg.get('message')}"
         elif t == MsgType.DISCONNECT.value:
@@ -374,10 +511,54 @@ class GameClient:
         elif t == MsgType.PONG.value:
             pass
 
+    def apply_state_fields(self, msg: Dict[str, object]) -> None:
+        """Campos comuns a STATE e STATE_DELTA; a grade já foi atualizada."""
+        self.state_seq = msg.get("seq")  # type: ignore[assignment]
+        self.turn = int(msg.get("turn"))  # type: ignore[arg-type]
+        self.winner = msg.get("winner")  # type: ignore[assignment]
+        self.players_present = msg.get("players", self.players_present)  # type: ignore[assignment]
+        self.jump_lock = msg.get("jump_lock")  # type: ignore[assignment]
+        self.reset_votes = msg.get("reset_votes", self.reset_votes)  # type: ignore[assignment]
+        lock = self.jump_lock
+        self._my_lock = (
+            tuple(lock.get("pos", [])) if lock and lock.get("player") == self.player_id else None  # type: ignore[assignment]
+        )
+        self._rv_p1 = bool(self.reset_votes.get("p1"))
+        self._rv_p2 = bool(self.reset_votes.get("p2"))
+
+        if self.player_id in (Cell.P1, Cell.P2):
+            mine, other = (self._rv_p1, self._rv_p2) if self.player_id == Cell.P1 else (self._rv_p2, self._rv_p1)
+            if mine and not other:
+                self.status_msg = "Pedido de reinício enviado. Aguardando o outro jogador…"
+            elif mine and other:
+                self.status_msg = "Partida reiniciada (consenso)."
+            else:
+                if not self.winner:
+                    self.status_msg = ""
+
+        if self._my_lock:
+            self.selected = self._my_lock
+            _, self.valid_jump = self.moves_for(self.selected)
+            self.valid_simple = 0
+            self.status_msg = "Cadeia de saltos ativa. Use ESPAÇO para encerrar."
+        else:
+            if self.selected:
+                if self.board.cell(self.selected[0], self.selected[1]) != (self.player_id or 0):
+                    self.selected = None
+                    self.valid_simple = self.valid_jump = 0
+                else:
+                    self.valid_simple, self.valid_jump = self.moves_for(self.selected)
+            if self.winner:
+                self.status_msg = f"Vitória do Jogador {1 if self.winner == Cell.P1 else 2}"
+
     def run(self) -> None:
         running = True
+        # Só redesenha quando algo mudou: evento de entrada/janela ou mensagem da rede
+        frame_dirty = True
         while running:
             for event in pygame.event.get():
+                if event.type != pygame.MOUSEMOTION:  # nada reage ao ponteiro parado/em movimento
+                    frame_dirty = True
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
@@ -390,10 +571,14 @@ class GameClient:
                 elif event.type == pygame.MOUSEWHEEL:
                     self.handle_mouse_wheel(event)
 
-            for msg in self.client.poll():
-                self.on_message(msg)
+            msgs = self.client.poll()
+            if msgs:
+                self.on_messages(msgs)
+                frame_dirty = True
 
-            self.draw_board()
-            pygame.display.flip()
+            if frame_dirty:
+                self.draw_board()
+                pygame.display.flip()
+                frame_dirty = False
             self.clock.tick(60)
         pygame.quit()
\ No newline at end of file
@@ -25,4 +25,11 @@ P2_COLOR = (255, 110, 110)
 
 # Rede/estado
 HEARTBEAT_SECONDS: int = 10
-MAX_CHAT_HISTORY: int = 200
\ No newline at end of file
+MAX_CHAT_HISTORY: int = 200
+RECV_CHUNK: int = 64 * 1024  # bytes lidos por chamada de recv
+MAX_INBOX: int = 4096  # mensagens recebidas aguardando poll() no cliente
+SOCK_RCVBUF: int = 1 << 20  # buffers do kernel (cliente: antes do connect; servidor: listen/accept)
+SOCK_SNDBUF: int = 1 << 20
+NOTSENT_LOWAT: int = 16 * 1024  # servidor: máximo de bytes não enviados no kernel por conexão
+MAX_SEND_BUF: int = 1 << 20  # servidor: saída pendente por cliente antes de desconectá-lo
+MAX_FRAME: int = 1 << 20  # maior frame aceito, com prefixo de tamanho ou linha ainda sem "\n" (nos dois lados)
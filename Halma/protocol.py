@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import json
+import struct
 from enum import Enum, IntEnum
-from typing import Iterable, Tuple
+from typing import Any, Dict, Iterable, Tuple, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # dependência opcional; cai no json da stdlib
+    orjson = None
 
 # Direções (8-vizinhos)
 DIRS: Tuple[Tuple[int, int], ...] = (
@@ -19,8 +26,11 @@ class Cell(IntEnum):
 class MsgType(str, Enum):
     JOIN = "join"
     STATE = "state"
+    STATE_DELTA = "state_delta"  # só as casas alteradas desde o STATE anterior
+    SYNC = "sync"  # cliente perdeu a base de um delta e pede o STATE completo
     CHAT = "chat"
     MOVE = "move"
+    MOVES = "moves"  # consulta dos destinos válidos de uma peça (resposta vem do cache do servidor)
     ENDJUMP = "endjump"
     RESET = "reset"
     RESIGN = "resign"
@@ -28,8 +38,49 @@ class MsgType(str, Enum):
     PONG = "pong"
     ERROR = "error"
     DISCONNECT = "disconnect"  # uso interno do cliente
+    OVERFLOW = "overflow"  # uso interno do cliente: caixa de entrada descartou mensagens
 
 
 def neighbors(r: int, c: int) -> Iterable[Tuple[int, int]]:
     for dr, dc in DIRS:
-        yield r + dr, c + dc
\ No newline at end of file
+        yield r + dr, c + dc
+
+
+# --- Codificação das mensagens ---
+# Dois enquadramentos, distinguíveis pelo primeiro byte de cada frame:
+#   * JSON + "\n" (legado): começa sempre com "{";
+#   * prefixo de tamanho: 4 bytes big-endian + JSON; como os frames têm menos de 16 MiB,
+#     o primeiro byte é sempre 0x00.
+Buffer = Union[bytes, bytearray, memoryview]
+LEN_HEADER = struct.Struct(">I")
+
+if orjson is not None:
+    def encode_json(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    _APPEND_NEWLINE = orjson.OPT_APPEND_NEWLINE
+
+    def encode_line(obj: Dict[str, Any]) -> bytes:
+        # O "\n" sai do próprio orjson, sem concatenar (e copiar) o JSON depois
+        return orjson.dumps(obj, option=_APPEND_NEWLINE)
+
+    def decode_line(line: Buffer) -> Any:
+        return orjson.loads(line)
+else:
+    # Encoder reaproveitado: json.dumps com argumentos cria um JSONEncoder novo a cada chamada
+    _encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def encode_json(obj: Any) -> bytes:
+        return _encode(obj).encode("utf-8")
+
+    def encode_line(obj: Dict[str, Any]) -> bytes:
+        return (_encode(obj) + "\n").encode("utf-8")
+
+    def decode_line(line: Buffer) -> Any:
+        return json.loads(str(line, "utf-8"))
+
+
+def encode_frame(obj: Dict[str, Any]) -> bytes:
+    """Mensagem com prefixo de tamanho (4 bytes big-endian + JSON)."""
+    payload = encode_json(obj)
+    return LEN_HEADER.pack(len(payload)) + payload
@@ -1,16 +1,49 @@
 from __future__ import annotations
 
-import json
 import logging
+import selectors
 import socket
-import threading
+import struct
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Sequence, Set, Tuple
-
-from .board import Board, compute_moves
-from .protocol import Cell, MsgType
-from .config import HEARTBEAT_SECONDS, MAX_CHAT_HISTORY
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from .board import Board, compute_move_masks, mask_indices
+from .protocol import LEN_HEADER, Cell, MsgType, decode_line, encode_json
+from .config import (
+    N,
+    HEARTBEAT_SECONDS,
+    MAX_CHAT_HISTORY,
+    MAX_FRAME,
+    MAX_SEND_BUF,
+    NOTSENT_LOWAT,
+    RECV_CHUNK,
+    SOCK_RCVBUF,
+    SOCK_SNDBUF,
+)
+
+# Só existe no Linux (valor 25); limita o que fica parado no buffer de envio do kernel
+_TCP_NOTSENT_LOWAT = getattr(socket, "TCP_NOTSENT_LOWAT", None)
+
+# Só existe no Linux; o kernel desarma a opção após cada ACK, então é reativada a cada recv
+_TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+
+# IPTOS_LOWDELAY e SO_LINGER ligado com timeout 0 (close envia RST)
+_IPTOS_LOWDELAY = 0x10
+_LINGER_ABORT = struct.pack("ii", 1, 0)
+
+# Bytes já consumidos no início do buffer de entrada antes de compactá-lo
+_RECV_COMPACT = 4096
+
+# Valores do enum resolvidos uma vez (evita o descritor do Enum a cada mensagem)
+_CHAT_T = MsgType.CHAT.value
+_ERROR_T = MsgType.ERROR.value
+_MOVES_T = MsgType.MOVES.value
+_PONG_FRAME = encode_json({"type": MsgType.PONG.value})
+
+# Adversário de cada jogador (troca de turno, vencedor por desistência)
+_OTHER: Dict[int, Cell] = {Cell.P1: Cell.P2, Cell.P2: Cell.P1}
 
 
 @dataclass
@@ -19,291 +52,655 @@ class JumpLock:
     pos: List[int]  # [r, c]
 
 
+@dataclass(eq=False)
+class ClientConn:
+    conn: socket.socket
+    addr: Tuple[str, int]
+    pid: Optional[int]
+    recv_buf: bytearray = field(default_factory=bytearray)
+    recv_pos: int = 0  # início do dado ainda não consumido em recv_buf
+    send_buf: bytearray = field(default_factory=bytearray)
+    last_seen: float = field(default_factory=time.monotonic)
+    want_write: bool = False  # EVENT_WRITE armado (sobrou dado que o kernel não aceitou)
+    state_behind: bool = False  # STATEs pulados enquanto a conexão estava travada
+    length_prefixed: bool = False  # cliente já mandou frame com prefixo de tamanho: responde igual
+    evicted: bool = False  # estourou MAX_SEND_BUF: não recebe mais nada até ser derrubado
+    synced: bool = False  # já tem o STATE da última sequência: pode receber só deltas
+    fd: int = field(init=False)  # chave em HalmaServer.clients (fileno() vira -1 após o close)
+
+    def __post_init__(self) -> None:
+        self.fd = self.conn.fileno()
+
+
 class HalmaServer:
     def __init__(self, host: str = "0.0.0.0", port: int = 50007) -> None:
         self.host = host
         self.port = port
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.clients: List[Tuple[socket.socket, Tuple[str, int], Optional[int]]] = []  # (conn, addr, player_id)
-        self.clients_lock = threading.Lock()
-        self.state_lock = threading.Lock()
+        # Um único thread multiplexa todas as conexões (epoll/kqueue); por isso o estado
+        # do jogo só é tocado pelo loop e dispensa locks
+        self.sel = selectors.DefaultSelector()
+        self.clients: Dict[int, ClientConn] = {}  # por fd: entrada e saída em O(1)
+        # Mesmos clientes, do que falou há mais tempo ao mais recente: a varredura de
+        # inatividade para no primeiro que ainda está dentro do prazo
+        self._by_activity: "OrderedDict[int, ClientConn]" = OrderedDict()
+        self._state_dirty = False  # STATE pendente: enviado uma vez no fim do ciclo do loop
+        self._pending: List[ClientConn] = []  # clientes com saída nova a escrever no fim do ciclo
+        self._overflowed: List[ClientConn] = []  # estouraram MAX_SEND_BUF: desconectados no fim do ciclo
+        # STATE serializado em cache; qualquer mutação incrementa a versão e invalida o cache
+        self._state_version = 0
+        self._state_cache: Optional[bytes] = None
+        # Sequência dos STATEs enviados e a grade do último, base para os deltas
+        self._state_seq = 0
+        self._last_sent_grid = b""
+        # Máscaras (simples, saltos) por casa de origem, válidas só para a versão atual do estado
+        self._moves_cache: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        # Bloco de leitura único (loop de um thread só): um recv traz todo o lote que o cliente
+        # mandou de uma vez; o STATE resultante já sai uma vez só no fim do ciclo
+        self._rx = bytearray(RECV_CHUNK)
+        self._rx_mv = memoryview(self._rx)
+        # Despacho por tabela: um dict.get por mensagem em vez da cadeia de comparações
+        self._handlers: Dict[str, Callable[[ClientConn, int, Dict[str, object]], None]] = {
+            MsgType.CHAT.value: self._h_chat,
+            MsgType.MOVE.value: self._h_move,
+            MsgType.MOVES.value: self._h_moves,
+            MsgType.ENDJUMP.value: self._h_endjump,
+            MsgType.RESET.value: self._h_reset,
+            MsgType.RESIGN.value: self._h_resign,
+            MsgType.PING.value: self._h_ping,
+            MsgType.SYNC.value: self._h_sync,
+        }
         self.logger = logging.getLogger("halma.server")
         self.reset()
 
     def start(self) -> None:
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Antes do listen: as conexões aceitas herdam o buffer (e a escala de janela do SYN)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_RCVBUF)
         self.sock.bind((self.host, self.port))
-        self.sock.listen(5)
+        # Um accept por evento de leitura: o backlog do kernel absorve rajadas de conexões
+        self.sock.listen(socket.SOMAXCONN)
+        self.sock.setblocking(False)
+        self.sel.register(self.sock, selectors.EVENT_READ, None)
         self.logger.info("Servidor ouvindo em %s:%s", self.host, self.port)
-        threading.Thread(target=self._accept_loop, daemon=True).start()
         try:
-            while True:
-                time.sleep(1)
+            self._serve_forever()
         except KeyboardInterrupt:
             self.logger.info("Encerrando servidor...")
         finally:
-            with self.clients_lock:
-                for c, *_ in self.clients:
-                    try:
-                        c.close()
-                    except Exception:
-                        pass
+            for client in self.clients.values():
+                try:
+                    client.conn.close()
+                except Exception:
+                    pass
+            self.sel.close()
             self.sock.close()
 
     def reset(self) -> None:
-        with self.state_lock:
-            self.board = Board()
-            self.turn: int = Cell.P1
-            self.winner: Optional[int] = None
-            self.chat_log: List[Dict[str, object]] = []  # {player, text}
-            self.player_slots: Dict[int, Optional[socket.socket]] = {Cell.P1: None, Cell.P2: None}
-            self.jump_lock: Optional[JumpLock] = None
-            self.reset_votes: Set[int] = set()
+        self.board = Board()
+        self.turn: int = Cell.P1
+        self.winner: Optional[int] = None
+        # Entradas {player, text} já serializadas em JSON: o STATE só as concatena
+        self.chat_log: Deque[bytes] = deque(maxlen=MAX_CHAT_HISTORY)
+        self._chat_blob: Optional[bytes] = None  # b",".join(chat_log), refeito só quando o chat muda
+        self.player_slots: Dict[int, Optional[socket.socket]] = {Cell.P1: None, Cell.P2: None}
+        self.jump_lock: Optional[JumpLock] = None
+        self.reset_votes: Set[int] = set()
+        # Entradas de chat do sistema ainda não enviadas (as dos jogadores já vão em CHAT)
+        self._chat_tail: List[bytes] = []
+        self._force_full = True  # grade e chat recomeçam: o próximo envio é sempre completo
+        self._touch()
+
+    def _touch(self) -> None:
+        """Marca o estado como alterado: invalida o STATE em cache."""
+        self._state_version += 1
+        self._state_cache = None
+        self._moves_cache = {}
+
+    def _moves(self, start: Tuple[int, int]) -> Tuple[int, int]:
+        """compute_move_masks memoizado."""
+        moves = self._moves_cache.get(start)
+        if moves is None:
+            moves = self._moves_cache[start] = compute_move_masks(self.board, start)
+        return moves
+
+    def _log_chat(self, player: int, text: str, relayed: bool = False) -> None:
+        entry = encode_json({"player": player, "text": text})
+        self.chat_log.append(entry)
+        self._chat_blob = None
+        if relayed:
+            # Já foi entregue como CHAT: basta o próximo STATE completo incluí-lo
+            self._state_cache = None
+            return
+        self._chat_tail.append(entry)
+        self._touch()
 
     # --- rede ---
-    def _accept_loop(self) -> None:
+    def _serve_forever(self) -> None:
+        last_sweep = time.monotonic()
         while True:
+            for key, mask in self.sel.select(timeout=1.0):
+                if key.data is None:
+                    self._accept()
+                    continue
+                client: ClientConn = key.data
+                try:
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(client)
+                    if mask & selectors.EVENT_WRITE and self._connected(client):
+                        self._flush(client)
+                except Exception as e:
+                    self.logger.exception("Erro no cliente %s: %s", client.addr, e)
+                    self._drop(client, abort=True)
+
+            now = time.monotonic()
+            if now - last_sweep >= 1.0:
+                last_sweep = now
+                # Sem heartbeat por 3 intervalos: considera a conexão morta
+                deadline = now - HEARTBEAT_SECONDS * 3
+                idle: List[ClientConn] = []
+                for client in self._by_activity.values():
+                    if client.last_seen >= deadline:
+                        break
+                    idle.append(client)
+                for client in idle:
+                    self._drop(client, abort=True)
+
+            self._end_tick()
+
+    def _end_tick(self) -> None:
+        # Repete até assentar: derrubar um cliente (estouro aqui, erro de escrita no flush) pode
+        # liberar um assento, e esse STATE tem de sair neste ciclo, não depois do próximo select
+        while True:
+            if self._overflowed:
+                # Consumidor lento demais: derruba em vez de acumular memória sem limite
+                overflowed, self._overflowed = self._overflowed, []
+                for client in overflowed:
+                    self.logger.warning("Buffer de saída de %s passou de %d bytes; desconectando", client.addr, MAX_SEND_BUF)
+                    self._drop(client, abort=True)
+            if self._state_dirty:
+                # Vários eventos no mesmo ciclo geram um único STATE (que pode estourar mais alguém)
+                self._push_state()
+                continue
+            # Escrita otimista: uma tentativa de send por cliente por ciclo; o seletor só
+            # é (re)armado para escrita quando o kernel não aceita tudo de uma vez
+            pending, self._pending = self._pending, []
+            for client in pending:
+                if client.send_buf and not client.want_write and self._connected(client):
+                    self._flush(client)
+            if not self._state_dirty and not self._overflowed:
+                return
+
+    def _accept(self) -> None:
+        try:
             conn, addr = self.sock.accept()
-            self.logger.info("Conectado: %s", addr)
-            threading.Thread(target=self._client_thread, args=(conn, addr), daemon=True).start()
+        except BlockingIOError:
+            return
+        self.logger.info("Conectado: %s", addr)
+        conn.setblocking(False)
+        self._tune_socket(conn)
+        self._quickack(conn)
+        client = ClientConn(conn, addr, self._assign_player(conn))
+        self.clients[client.fd] = client
+        self._by_activity[client.fd] = client
+        self.sel.register(conn, selectors.EVENT_READ, client)
+        pid = client.pid
+        # JOIN e o STATE ficam juntos no send_buf e saem num único send() no fim do ciclo
+        self._safe_send(client, {"type": MsgType.JOIN.value, "player": pid})
+        if pid is not None:
+            # Novo jogador muda "players": todos recebem o STATE (ele, completo)
+            self._state_dirty = True
+        else:
+            # Espectador não altera nada: só ele recebe o STATE atual
+            self._send_full_state(client)
+
+    @staticmethod
+    def _tune_socket(conn: socket.socket) -> None:
+        opts = [
+            # Mensagens curtas e interativas: sem Nagle para não atrasar lances/chat. Cada
+            # escrita vira um segmento, o que é o desejado: cada uma já é um frame completo.
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+            # Folga para rajadas (STATE completo para vários espectadores de uma vez)
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_SNDBUF),
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_RCVBUF),
+            # Tráfego interativo: marca os pacotes como de baixa latência
+            (socket.IPPROTO_IP, socket.IP_TOS, _IPTOS_LOWDELAY),
+        ]
+        if _TCP_NOTSENT_LOWAT is not None:
+            opts.append((socket.IPPROTO_TCP, _TCP_NOTSENT_LOWAT, NOTSENT_LOWAT))
+        for level, opt, value in opts:
+            try:
+                conn.setsockopt(level, opt, value)
+            except OSError:
+                pass
 
-    def _safe_send(self, conn: socket.socket, obj: Dict[str, object]) -> bool:
-        line = json.dumps(obj, separators=(",", ":")) + "\n"
+    @staticmethod
+    def _quickack(conn: socket.socket) -> None:
+        # ACK imediato: não deixa o ACK atrasado do kernel segurar a resposta ao cliente
+        if _TCP_QUICKACK is not None:
+            try:
+                conn.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+            except OSError:
+                pass
+
+    def _drop(self, client: ClientConn, abort: bool = False) -> None:
+        """Encerra a conexão; `abort` (desconexão forçada) fecha com RST em vez de esperar o FIN."""
+        if not self._connected(client):
+            return
+        self.logger.info("Desconectado: %s", client.addr)
+        del self.clients[client.fd]
+        del self._by_activity[client.fd]
         try:
-            conn.sendall(line.encode("utf-8"))
-            return True
+            self.sel.unregister(client.conn)
+        except (KeyError, ValueError):
+            pass
+        v0 = self._state_version
+        self._release_player(client)
+        try:
+            if abort:
+                # Descarta o que ainda está no buffer de envio: o socket não fica em linger
+                client.conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_ABORT)
+            client.conn.close()
         except Exception:
-            return False
+            pass
+        if self._state_version != v0:
+            self._state_dirty = True
+
+    def _connected(self, client: ClientConn) -> bool:
+        # Compara identidade: após um close o mesmo fd pode ser reutilizado por outra conexão
+        return self.clients.get(client.fd) is client
+
+    def _queue(self, client: ClientConn, payload: bytes) -> None:
+        """Enfileira um JSON já serializado, no enquadramento do cliente; a escrita acontece no fim do ciclo."""
+        if client.evicted:
+            return
+        if not client.send_buf:
+            self._pending.append(client)
+        if client.length_prefixed:
+            client.send_buf += LEN_HEADER.pack(len(payload))
+            client.send_buf += payload
+        else:
+            client.send_buf += payload
+            client.send_buf += b"\n"
+        if len(client.send_buf) > MAX_SEND_BUF:
+            # Não derruba aqui (quem chama pode estar iterando self.clients), mas para de acumular
+            client.evicted = True
+            self._overflowed.append(client)
+
+    def _safe_send(self, client: ClientConn, obj: Dict[str, object]) -> None:
+        # Nunca falha no ato: erros de envio e estouro de buffer são tratados no fim do ciclo
+        self._queue(client, encode_json(obj))
+
+    def _flush(self, client: ClientConn) -> None:
+        try:
+            n = client.conn.send(client.send_buf)
+        except BlockingIOError:
+            n = 0
+        except OSError:
+            self._drop(client)
+            return
+        del client.send_buf[:n]
+        if not client.send_buf and client.state_behind:
+            # Buffer drenado: no lugar dos STATEs pulados vai só o mais recente
+            client.state_behind = False
+            self._send_full_state(client)
+        if client.send_buf and not client.want_write:
+            client.want_write = True
+            self.sel.modify(client.conn, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+        elif not client.send_buf and client.want_write:
+            client.want_write = False
+            self.sel.modify(client.conn, selectors.EVENT_READ, client)
 
     def _broadcast(self, obj: Dict[str, object]) -> None:
-        dead: List[socket.socket] = []
-        with self.clients_lock:
-            for (c, _, _) in self.clients:
-                if not self._safe_send(c, obj):
-                    dead.append(c)
-            if dead:
-                self.clients = [(c, a, p) for (c, a, p) in self.clients if c not in dead]
-                for d in dead:
-                    self._release_player(d)
+        # Serializa uma vez; os mesmos bytes vão para todos os clientes
+        data = encode_json(obj)
+        for client in self.clients.values():
+            self._queue(client, data)
 
     def _push_state(self) -> None:
-        with self.state_lock:
-            state = {
-                "type": MsgType.STATE.value,
-                "board": self.board.serialize(),
-                "turn": int(self.turn),
-                "winner": int(self.winner) if self.winner is not None else None,
-                "chat": self.chat_log[-MAX_CHAT_HISTORY:],
-                "players": {"p1": self.player_slots[Cell.P1] is not None, "p2": self.player_slots[Cell.P2] is not None},
-                "jump_lock": None if not self.jump_lock else {"player": int(self.jump_lock.player), "pos": self.jump_lock.pos},
-                "reset_votes": {"p1": Cell.P1 in self.reset_votes, "p2": Cell.P2 in self.reset_votes},
-            }
-        self._broadcast(state)
+        self._state_dirty = False
+        if not self.clients:
+            # Sem plateia: nada é serializado; quem conectar depois recebe o STATE completo
+            self._force_full = True
+            self._chat_tail = []
+            return
+        base = self._state_seq
+        self._state_seq += 1
+        self._state_cache = None  # o STATE completo leva "seq"
+        delta = None if self._force_full else self._build_delta(base)
+        self._force_full = False
+        self._last_sent_grid = self.board.snapshot()
+        self._chat_tail = []
+        for client in self.clients.values():
+            if client.want_write:
+                # Peer lento: não empilha snapshots velhos atrás do que ainda não saiu
+                client.state_behind = True
+                client.synced = False
+            elif client.synced and delta is not None:
+                self._queue(client, delta)
+            else:
+                self._queue(client, self._state_bytes())
+                client.synced = True
+
+    def _send_full_state(self, client: ClientConn) -> None:
+        """STATE completo só para `client`."""
+        if self._state_dirty:
+            # O push do fim do ciclo já manda o completo para quem não está sincronizado
+            client.synced = False
+        else:
+            self._queue(client, self._state_bytes())
+            client.synced = True
+
+    def _state_bytes(self) -> bytes:
+        data = self._state_cache
+        if data is None:
+            data = self._state_cache = self._build_state()
+        return data
+
+    def _state_fields(self) -> Dict[str, object]:
+        return {
+            "seq": self._state_seq,
+            "turn": int(self.turn),
+            "winner": int(self.winner) if self.winner is not None else None,
+            "players": {"p1": self.player_slots[Cell.P1] is not None, "p2": self.player_slots[Cell.P2] is not None},
+            "jump_lock": None if not self.jump_lock else {"player": int(self.jump_lock.player), "pos": self.jump_lock.pos},
+            "reset_votes": {"p1": Cell.P1 in self.reset_votes, "p2": Cell.P2 in self.reset_votes},
+        }
+
+    @staticmethod
+    def _with_chat(obj: Dict[str, object], chat: bytes) -> bytes:
+        # "chat" vai por último: as entradas já serializadas entram sem passar pelo encoder
+        body = encode_json(obj)
+        return b"".join((body[:-1], b',"chat":[', chat, b"]}"))
+
+    def _build_state(self) -> bytes:
+        state: Dict[str, object] = {"type": MsgType.STATE.value, "board": self.board.serialize()}
+        state.update(self._state_fields())
+        chat = self._chat_blob
+        if chat is None:
+            chat = self._chat_blob = b",".join(self.chat_log)
+        return self._with_chat(state, chat)
+
+    def _build_delta(self, base: int) -> bytes:
+        """Casas [índice, valor] que mudaram desde o STATE `base`, mais os campos pequenos."""
+        changes = self.board.changes_since(self._last_sent_grid)
+        delta: Dict[str, object] = {"type": MsgType.STATE_DELTA.value, "base": base, "changes": changes}
+        delta.update(self._state_fields())
+        return self._with_chat(delta, b",".join(self._chat_tail))
 
     # --- jogadores ---
     def _assign_player(self, conn: socket.socket) -> Optional[int]:
-        with self.state_lock:
-            pid: Optional[int] = None
-            if self.player_slots[Cell.P1] is None:
-                self.player_slots[Cell.P1] = conn
-                pid = Cell.P1
-            elif self.player_slots[Cell.P2] is None:
-                self.player_slots[Cell.P2] = conn
-                pid = Cell.P2
-            return pid
-
-    def _release_player(self, conn: socket.socket) -> None:
-        with self.state_lock:
-            for p in (Cell.P1, Cell.P2):
-                if self.player_slots[p] is conn:
-                    self.player_slots[p] = None
-            if self.jump_lock and self.player_slots.get(self.jump_lock.player) is None:
-                self.jump_lock = None
-            self.reset_votes = {p for p in self.reset_votes if self.player_slots.get(p) is not None}
+        """Reserva uma vaga; o id volta como int simples e fica no ClientConn (sem conversões por mensagem)."""
+        pid: Optional[int] = None
+        if self.player_slots[Cell.P1] is None:
+            self.player_slots[Cell.P1] = conn
+            pid = int(Cell.P1)
+        elif self.player_slots[Cell.P2] is None:
+            self.player_slots[Cell.P2] = conn
+            pid = int(Cell.P2)
+        if pid is not None:
+            self._touch()
+        return pid
+
+    def _release_player(self, client: ClientConn) -> None:
+        # O registro já diz qual vaga a conexão ocupa; a checagem de identidade cobre o reset()
+        pid = client.pid
+        if pid is None or self.player_slots.get(pid) is not client.conn:
+            return  # espectador: nada muda no estado
+        self.player_slots[pid] = None
+        if self.jump_lock and self.player_slots.get(self.jump_lock.player) is None:
+            self.jump_lock = None
+        self.reset_votes = {p for p in self.reset_votes if self.player_slots.get(p) is not None}
+        self._touch()
 
     # --- regras ---
     def _apply_move(self, pid: int, src: Tuple[int, int], dst: Tuple[int, int]) -> bool:
         r0, c0 = src
         self.board.set_cell(r0, c0, Cell.EMPTY)
         self.board.set_cell(dst[0], dst[1], pid)
+        self._touch()
 
         if self.board.is_victory(pid):
             self.winner = pid
             self.jump_lock = None
             return True
 
-        _, next_jumps = compute_moves(self.board, dst)
-        if dst in next_jumps:
-            next_jumps.remove(dst)
+        # Calculado já na nova versão: o próximo passo da cadeia (origem = dst) reaproveita
+        _, next_jumps = self._moves(dst)
         if next_jumps:
             self.jump_lock = JumpLock(player=pid, pos=[dst[0], dst[1]])
             return False
         else:
             self.jump_lock = None
-            self.turn = Cell.P2 if self.turn == Cell.P1 else Cell.P1
+            self.turn = _OTHER[self.turn]
             return True
 
     def _validate_and_apply_move(self, pid: int, move: Dict[str, object]) -> Tuple[bool, Optional[str]]:
-        with self.state_lock:
-            if self.winner:
-                return False, "Partida encerrada"
-            if pid != self.turn:
-                return False, "Não é a sua vez"
-
-            src_list = move.get("src", [])
-            dst_list = move.get("dst", [])
-            try:
-                src: Tuple[int, int] = (int(src_list[0]), int(src_list[1]))  # type: ignore[index]
-                dst: Tuple[int, int] = (int(dst_list[0]), int(dst_list[1]))  # type: ignore[index]
-            except Exception:
-                return False, "Movimento inválido"
-
-            r0, c0 = src
-            if not self.board.inside(r0, c0) or self.board.cell(r0, c0) != pid:
-                return False, "Origem inválida"
-
-            simple, jumps = compute_moves(self.board, src)
-
-            if self.jump_lock and self.jump_lock.player == pid:
-                if src != tuple(self.jump_lock.pos):
-                    return False, "Você deve continuar a cadeia de saltos com a mesma peça"
-                if dst not in jumps:
-                    return False, "Apenas saltos são permitidos durante a cadeia"
-                self._apply_move(pid, src, dst)
-                return True, None
-
-            if dst in simple:
-                self.board.set_cell(r0, c0, Cell.EMPTY)
-                self.board.set_cell(dst[0], dst[1], pid)
-                if self.board.is_victory(pid):
-                    self.winner = pid
-                else:
-                    self.turn = Cell.P2 if self.turn == Cell.P1 else Cell.P1
-                self.jump_lock = None
-                return True, None
-            elif dst in jumps:
-                self._apply_move(pid, src, dst)
-                return True, None
-            else:
-                return False, "Destino não é válido"
+        if self.winner:
+            return False, "Partida encerrada"
+        if pid != self.turn:
+            return False, "Não é a sua vez"
 
-    def _end_jump_chain(self, pid: int) -> Tuple[bool, Optional[str]]:
-        with self.state_lock:
-            if not self.jump_lock or self.jump_lock.player != pid:
-                return False, "Nenhuma cadeia de saltos ativa"
-            self.jump_lock = None
-            if not self.winner:
-                self.turn = Cell.P2 if self.turn == Cell.P1 else Cell.P1
+        src_list = move.get("src", [])
+        dst_list = move.get("dst", [])
+        try:
+            src: Tuple[int, int] = (int(src_list[0]), int(src_list[1]))  # type: ignore[index]
+            dst: Tuple[int, int] = (int(dst_list[0]), int(dst_list[1]))  # type: ignore[index]
+        except Exception:
+            return False, "Movimento inválido"
+
+        r0, c0 = src
+        if not self.board.inside(r0, c0) or self.board.cell(r0, c0) != pid:
+            return False, "Origem inválida"
+
+        simple, jumps = self._moves(src)
+        dst_bit = 1 << (dst[0] * N + dst[1]) if self.board.inside(dst[0], dst[1]) else 0
+
+        if self.jump_lock and self.jump_lock.player == pid:
+            if src != tuple(self.jump_lock.pos):
+                return False, "Você deve continuar a cadeia de saltos com a mesma peça"
+            if not jumps & dst_bit:
+                return False, "Apenas saltos são permitidos durante a cadeia"
+            self._apply_move(pid, src, dst)
             return True, None
 
-    def _resign(self, pid: int) -> Tuple[bool, Optional[str]]:
-        with self.state_lock:
-            if self.winner is not None:
-                return False, "Partida já encerrada"
-            if pid not in (Cell.P1, Cell.P2):
-                return False, "Apenas jogadores podem desistir"
-            self.winner = Cell.P2 if pid == Cell.P1 else Cell.P1
+        if simple & dst_bit:
+            self.board.set_cell(r0, c0, Cell.EMPTY)
+            self.board.set_cell(dst[0], dst[1], pid)
+            self._touch()
+            if self.board.is_victory(pid):
+                self.winner = pid
+            else:
+                self.turn = _OTHER[self.turn]
             self.jump_lock = None
-            self.chat_log.append({"player": 0, "text": f"Jogador {1 if pid == Cell.P1 else 2} desistiu."})
-            self.reset_votes.clear()
             return True, None
+        elif jumps & dst_bit:
+            self._apply_move(pid, src, dst)
+            return True, None
+        else:
+            return False, "Destino não é válido"
 
-    def _request_reset(self, pid: int) -> Tuple[bool, Optional[str], bool]:
-        with self.state_lock:
-            if pid not in (Cell.P1, Cell.P2):
-                return False, "Apenas jogadores podem solicitar reinício", False
-            if pid in self.reset_votes:
-                return True, None, False
-            self.reset_votes.add(pid)
-            self.chat_log.append({"player": 0, "text": f"Jogador {1 if pid == Cell.P1 else 2} solicitou reinício."})
-            if Cell.P1 in self.reset_votes and Cell.P2 in self.reset_votes:
-                self.chat_log.append({"player": 0, "text": "Partida será reiniciada por consenso dos dois jogadores."})
-                return True, None, True
-            return True, None, False
+    def _end_jump_chain(self, pid: int) -> Tuple[bool, Optional[str]]:
+        if not self.jump_lock or self.jump_lock.player != pid:
+            return False, "Nenhuma cadeia de saltos ativa"
+        self.jump_lock = None
+        if not self.winner:
+            self.turn = _OTHER[self.turn]
+        return True, None
 
-    # --- loop do cliente ---
-    def _client_thread(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
-        buf = b""
-        with self.clients_lock:
-            pid = self._assign_player(conn)
-            self.clients.append((conn, addr, pid))
-        self._safe_send(conn, {"type": MsgType.JOIN.value, "player": int(pid) if pid is not None else None})
-        self._push_state()
+    def _resign(self, pid: int) -> Tuple[bool, Optional[str]]:
+        if self.winner is not None:
+            return False, "Partida já encerrada"
+        if pid not in (Cell.P1, Cell.P2):
+            return False, "Apenas jogadores podem desistir"
+        self.winner = _OTHER[pid]
+        self.jump_lock = None
+        self._log_chat(0, f"Jogador {1 if pid == Cell.P1 else 2} desistiu.")
+        self.reset_votes.clear()
+        return True, None
 
+    def _request_reset(self, pid: int) -> Tuple[bool, Optional[str], bool]:
+        if pid not in (Cell.P1, Cell.P2):
+            return False, "Apenas jogadores podem solicitar reinício", False
+        if pid in self.reset_votes:
+            return True, None, False
+        self.reset_votes.add(pid)
+        self._log_chat(0, f"Jogador {1 if pid == Cell.P1 else 2} solicitou reinício.")
+        if Cell.P1 in self.reset_votes and Cell.P2 in self.reset_votes:
+            self._log_chat(0, "Partida será reiniciada por consenso dos dois jogadores.")
+            return True, None, True
+        return True, None, False
+
+    # --- mensagens do cliente ---
+    def _on_readable(self, client: ClientConn) -> None:
         try:
-            conn.settimeout(HEARTBEAT_SECONDS * 3)
-            while True:
-                data = conn.recv(4096)
-                if not data:
+            n = client.conn.recv_into(self._rx)
+        except BlockingIOError:
+            return
+        except OSError:
+            n = 0
+        if not n:
+            self._drop(client)
+            return
+        client.last_seen = time.monotonic()
+        self._by_activity.move_to_end(client.fd)
+        self._quickack(client.conn)
+
+        pending = client.recv_buf
+        if pending:
+            # O resto anterior não tem frame completo: um "\n" só pode estar no dado novo
+            buf = pending
+            start = client.recv_pos
+            scan = len(buf)
+            buf += self._rx_mv[:n]
+            end = len(buf)
+        else:
+            # Caso comum, nada pendente: analisa direto do bloco lido, sem copiá-lo antes
+            buf = self._rx
+            start = scan = 0
+            end = n
+        while start < end:
+            if buf[start] == 0:
+                # Prefixo de tamanho: 4 bytes big-endian + payload
+                if end - start < LEN_HEADER.size:
                     break
-                buf += data
-                while b"\n" in buf:
-                    line, buf = buf.split(b"\n", 1)
-                    if not line:
-                        continue
-                    try:
-                        msg = json.loads(line.decode("utf-8"))
-                    except Exception:
-                        self._safe_send(conn, {"type": MsgType.ERROR.value, "message": "JSON inválido"})
-                        continue
-
-                    mtype = msg.get("type")
-                    if mtype == MsgType.CHAT.value:
-                        text = str(msg.get("text", ""))[:500]
-                        with self.state_lock:
-                            self.chat_log.append({"player": int(pid) if pid else 0, "text": text})
-                        self._broadcast({"type": MsgType.CHAT.value, "player": int(pid) if pid else None, "text": text})
-
-                    elif mtype == MsgType.MOVE.value:
-                        ok, err = self._validate_and_apply_move(int(pid) if pid else 0, msg)
-                        if not ok:
-                            self._safe_send(conn, {"type": MsgType.ERROR.value, "message": err})
-                        with self.state_lock:
-                            if self.reset_votes:
-                                self.reset_votes.clear()
-                                self.chat_log.append({"player": 0, "text": "Votos de reinício foram limpos após novo lance."})
-                        self._push_state()
-
-                    elif mtype == MsgType.ENDJUMP.value:
-                        ok, err = self._end_jump_chain(int(pid) if pid else 0)
-                        if not ok:
-                            self._safe_send(conn, {"type": MsgType.ERROR.value, "message": err})
-                        self._push_state()
-
-                    elif mtype == MsgType.RESET.value:
-                        ok, err, should_reset = self._request_reset(int(pid) if pid else 0)
-                        if not ok:
-                            self._safe_send(conn, {"type": MsgType.ERROR.value, "message": err})
-                            self._push_state()
-                            continue
-                        if should_reset:
-                            self.reset()
-                            self.chat_log.append({"player": 0, "text": "Partida reiniciada."})
-                        self._push_state()
-
-                    elif mtype == MsgType.RESIGN.value:
-                        ok, err = self._resign(int(pid) if pid else 0)
-                        if not ok:
-                            self._safe_send(conn, {"type": MsgType.ERROR.value, "message": err})
-                        self._push_state()
-
-                    elif mtype == MsgType.PING.value:
-                        self._safe_send(conn, {"type": MsgType.PONG.value})
-
-                    else:
-                        self._safe_send(conn, {"type": MsgType.ERROR.value, "message": "Comando desconhecido"})
-
-        except socket.timeout:
-            pass
-        except Exception as e:
-            self.logger.exception("Erro no cliente %s: %s", addr, e)
-        finally:
-            self.logger.info("Desconectado: %s", addr)
-            with self.clients_lock:
-                self._release_player(conn)
-                self.clients = [(c, a, p) for (c, a, p) in self.clients if c is not conn]
+                (size,) = LEN_HEADER.unpack_from(buf, start)
+                if size > MAX_FRAME:
+                    self.logger.warning("Frame de %d bytes de %s; desconectando", size, client.addr)
+                    self._drop(client, abort=True)
+                    return
+                stop = start + LEN_HEADER.size + size
+                if stop > end:
+                    break
+                line = bytes(memoryview(buf)[start + LEN_HEADER.size:stop])
+                start = stop
+                client.length_prefixed = True
+            else:
+                idx = buf.find(b"\n", max(start, scan), end)
+                if idx == -1:
+                    if end - start > MAX_FRAME:
+                        # Linha sem "\n" maior que qualquer frame válido: não deixa o buffer crescer sem fim
+                        self.logger.warning("Linha de %s passou de %d bytes sem terminar; desconectando", client.addr, MAX_FRAME)
+                        self._drop(client, abort=True)
+                        return
+                    break
+                line = bytes(memoryview(buf)[start:idx])
+                start = idx + 1
+                if not line:
+                    continue
             try:
-                conn.close()
-            except Exception:
-                pass
-            self._push_state()
\ No newline at end of file
+                msg = decode_line(line)
+            except ValueError:
+                msg = None
+            if not isinstance(msg, dict):
+                # Lixo ou JSON que não é objeto: responde e segue, sem exceção nem traceback no log
+                self._safe_send(client, {"type": _ERROR_T, "message": "JSON inválido"})
+                continue
+            self._handle_message(client, msg)
+            if not self._connected(client):
+                return
+        if buf is not pending:
+            # Só o frame incompleto do fim (se houver) vai para o buffer do cliente
+            if start < end:
+                pending += self._rx_mv[start:end]
+            client.recv_pos = 0
+            return
+        # Compacta só quando tudo foi consumido ou o prefixo lido ficou grande
+        if start == end or start > _RECV_COMPACT:
+            del buf[:start]
+            start = 0
+        client.recv_pos = start
+
+    def _handle_message(self, client: ClientConn, msg: Dict[str, object]) -> None:
+        mtype = msg.get("type")
+        # Só strings são chaves da tabela: um "type" lista/dict nem é hasheável
+        handler = self._handlers.get(mtype) if isinstance(mtype, str) else None
+        if handler is None:
+            self._safe_send(client, {"type": _ERROR_T, "message": "Comando desconhecido"})
+            return
+        # STATE só é reenviado se a operação de fato mudou algo (versão incrementada)
+        v0 = self._state_version
+        handler(client, client.pid or 0, msg)
+        if self._state_version != v0:
+            self._state_dirty = True
+
+    def _error(self, client: ClientConn, message: Optional[str]) -> None:
+        self._safe_send(client, {"type": _ERROR_T, "message": message})
+
+    def _h_chat(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        text = str(msg.get("text", ""))[:500]
+        # O chat já vai na mensagem CHAT; não dispara STATE
+        self._log_chat(pid, text, relayed=True)
+        self._broadcast({"type": _CHAT_T, "player": pid or None, "text": text})
+
+    def _h_move(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        ok, err = self._validate_and_apply_move(pid, msg)
+        if not ok:
+            # Lance recusado não muda nada: só o ERROR, sem STATE para ninguém
+            self._error(client, err)
+        elif self.reset_votes:
+            self.reset_votes.clear()
+            self._log_chat(0, "Votos de reinício foram limpos após novo lance.")
+
+    def _h_moves(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        src_list = msg.get("src", [])
+        try:
+            src: Tuple[int, int] = (int(src_list[0]), int(src_list[1]))  # type: ignore[index]
+        except Exception:
+            src = (-1, -1)
+        if not self.board.inside(*src):
+            self._error(client, "Origem inválida")
+            return
+        # Só leitura: sai do mesmo cache usado na validação dos lances, sem STATE
+        simple, jumps = self._moves(src)
+        self._safe_send(
+            client,
+            {"type": _MOVES_T, "src": list(src), "simple": mask_indices(simple), "jumps": mask_indices(jumps)},
+        )
+
+    def _h_endjump(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        ok, err = self._end_jump_chain(pid)
+        if ok:
+            self._touch()
+        else:
+            self._error(client, err)
+
+    def _h_reset(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        ok, err, should_reset = self._request_reset(pid)
+        if not ok:
+            self._error(client, err)
+        elif should_reset:
+            self.reset()
+            self._log_chat(0, "Partida reiniciada.")
+
+    def _h_resign(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        ok, err = self._resign(pid)
+        if not ok:
+            self._error(client, err)
+
+    def _h_ping(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        self._queue(client, _PONG_FRAME)
+
+    def _h_sync(self, client: ClientConn, pid: int, msg: Dict[str, object]) -> None:
+        self._send_full_state(client)